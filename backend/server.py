@@ -15,7 +15,12 @@ def main():
         "src.agent.app:app",
         host="0.0.0.0",
         port=8123,
-        log_level="info"
+        log_level="info",
+        # uvicorn's default "auto" loop/http settings pick uvloop and httptools
+        # when installed (uvicorn[standard]); both are unavailable on Windows.
+        loop="auto",
+        http="auto",
+        workers=int(os.getenv("WEB_CONCURRENCY", 2))
     )
 
 if __name__ == "__main__":
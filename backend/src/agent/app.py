@@ -1,15 +1,32 @@
 # mypy: disable - error - code = "no-untyped-def,misc"
 import pathlib
+import sys
 import os
+import stat
 import asyncio
+import traceback
+import orjson
 from fastapi import FastAPI, Response, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, field_validator
 from typing import List
 
+from agent.exam_graph import (
+    exam_graph,
+    generate_research_topics,
+    research_knowledge,
+    get_combined_research,
+    generate_questions,
+    compile_exam_metadata,
+    generate_study_notes,
+    generate_pdf,
+)
+from agent.exam_tools_and_schemas import Difficulty, EducationLevel, QuestionType
+
 # Define the FastAPI app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 
 def create_frontend_router(build_dir="../frontend/dist"):
@@ -44,12 +61,18 @@ def create_frontend_router(build_dir="../frontend/dist"):
 
 # Exam generation request model
 class ExamRequest(BaseModel):
-    education_level: str = "middle"  # primary, middle, high
+    education_level: EducationLevel = EducationLevel.MIDDLE
     subject: str = "math"
     knowledge_topic: str
-    difficulty_level: str = "medium"
+    difficulty_level: Difficulty = Difficulty.MEDIUM
     question_count: int = 10
-    question_types: List[str] = ["multiple_choice", "short_answer"]
+    question_types: List[QuestionType] = [QuestionType.MULTIPLE_CHOICE, QuestionType.SHORT_ANSWER]
+
+    @field_validator("subject")
+    @classmethod
+    def _intern_subject(cls, value: str) -> str:
+        # 学科取值有限，驻留后状态副本共享同一个字符串对象
+        return sys.intern(value)
 
 
 # API endpoint for exam generation
@@ -57,10 +80,6 @@ class ExamRequest(BaseModel):
 async def generate_exam(request: ExamRequest):
     """Generate an exam based on the provided parameters."""
     try:
-        from agent.exam_graph import exam_graph
-        from agent.configuration import Configuration
-        from langchain_core.messages import HumanMessage
-        
         # Create initial state
         initial_state = {
             "messages": [HumanMessage(content=f"Generate an exam about {request.knowledge_topic}")],
@@ -78,7 +97,7 @@ async def generate_exam(request: ExamRequest):
         
         # Run the exam generation graph
         config = {"configurable": {}}
-        result = exam_graph.invoke(initial_state, config)
+        result = await exam_graph.ainvoke(initial_state, config)
         
         return {
             "success": True,
@@ -94,23 +113,50 @@ async def generate_exam(request: ExamRequest):
         raise HTTPException(status_code=500, detail=f"Error generating exam: {str(e)}")
 
 
-# API endpoint for streaming exam generation
-from fastapi.responses import StreamingResponse
-import json
-import time
+def _sse_event(payload: dict) -> bytes:
+    """Encode a payload as a single server-sent event frame."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
 
+
+async def _coalesce_sse(frames, max_frames: int = 4, max_delay: float = 0.05):
+    """Group SSE frames produced in quick succession into a single chunk.
+
+    Buffered frames are flushed once ``max_frames`` have accumulated, once
+    ``max_delay`` seconds pass without a new frame, or when the stream ends.
+    """
+    iterator = frames.__aiter__()
+    buffer = []
+    next_frame = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_frame}, timeout=max_delay if buffer else None)
+            if not done:
+                yield b"".join(buffer)
+                buffer.clear()
+                continue
+            try:
+                buffer.append(next_frame.result())
+            except StopAsyncIteration:
+                break
+            if len(buffer) >= max_frames:
+                yield b"".join(buffer)
+                buffer.clear()
+            next_frame = asyncio.ensure_future(iterator.__anext__())
+        if buffer:
+            yield b"".join(buffer)
+    finally:
+        next_frame.cancel()
+
+
+# API endpoint for streaming exam generation
 @app.post("/generate-exam-stream")
 async def generate_exam_stream(request: ExamRequest):
     """Generate an exam with streaming progress updates."""
     
     async def generate():
         try:
-            from agent.exam_graph import exam_graph
-            from agent.configuration import Configuration
-            from langchain_core.messages import HumanMessage
-            
             # Send initial status
-            yield f"data: {json.dumps({'step': 'initializing', 'message': '初始化试卷生成...', 'progress': 5})}\n\n"
+            yield _sse_event({'step': 'initializing', 'message': '初始化试卷生成...', 'progress': 5})
             await asyncio.sleep(0.1)  # Small delay to ensure message is sent
             
             # Create initial state
@@ -133,69 +179,69 @@ async def generate_exam_stream(request: ExamRequest):
             config = {"configurable": {}}
             
             # Manual step execution with progress updates
-            yield f"data: {json.dumps({'step': 'research_topics', 'message': '生成研究主题...', 'progress': 15})}\n\n"
+            yield _sse_event({'step': 'research_topics', 'message': '生成研究主题...', 'progress': 15})
             
             # Step 1: Generate research topics
-            from agent.exam_graph import generate_research_topics
-            state = generate_research_topics(initial_state, config)
+            state = await generate_research_topics(initial_state, config)
             initial_state.update(state)
             
             topics = initial_state.get('research_topics', [])
-            yield f"data: {json.dumps({'step': 'research_topics', 'message': f'已生成 {len(topics)} 个研究主题', 'progress': 25, 'data': topics})}\n\n"
+            yield _sse_event({'step': 'research_topics', 'message': f'已生成 {len(topics)} 个研究主题', 'progress': 25, 'data': topics})
             
             # Step 2: Research knowledge
-            yield f"data: {json.dumps({'step': 'research_knowledge', 'message': '收集知识内容...', 'progress': 35})}\n\n"
+            yield _sse_event({'step': 'research_knowledge', 'message': '收集知识内容...', 'progress': 35})
             
-            from agent.exam_graph import research_knowledge
-            research_results = []
-            for i, topic in enumerate(topics):
+            async def _research_topic(i, topic):
                 research_state = {
                     "research_topic": topic,
                     "main_topic": initial_state["knowledge_topic"],
                     "difficulty_level": initial_state["difficulty_level"],
                     "id": i
                 }
-                result = research_knowledge(research_state, config)
-                research_results.extend(result.get("research_content", []))
+                return i, topic, await research_knowledge(research_state, config)
+            
+            # Research all topics concurrently, reporting progress as each one finishes
+            research_results: List[str] = [""] * len(topics)
+            pending = [_research_topic(i, topic) for i, topic in enumerate(topics)]
+            for completed, next_result in enumerate(asyncio.as_completed(pending), 1):
+                i, topic, result = await next_result
+                research_results[i] = (result.get("research_content") or [""])[0]
                 
-                progress = 35 + (i + 1) / len(topics) * 15
-                yield f"data: {json.dumps({'step': 'research_knowledge', 'message': f'正在研究: {topic}', 'progress': progress})}\n\n"
+                progress = 35 + completed / len(topics) * 15
+                yield _sse_event({'step': 'research_knowledge', 'message': f'正在研究: {topic}', 'progress': progress})
             
             initial_state["research_content"] = research_results
+            initial_state["combined_research"] = get_combined_research(initial_state)
             
             # Step 3: Generate questions
-            yield f"data: {json.dumps({'step': 'generate_questions', 'message': '开始生成题目...', 'progress': 55})}\n\n"
+            yield _sse_event({'step': 'generate_questions', 'message': '开始生成题目...', 'progress': 55})
             
-            from agent.exam_graph import generate_questions
-            question_state = generate_questions(initial_state, config)
+            question_state = await generate_questions(initial_state, config)
             initial_state.update(question_state)
             
             questions = initial_state.get("generated_questions", [])
-            yield f"data: {json.dumps({'step': 'generate_questions', 'message': f'已生成 {len(questions)} 道题目', 'progress': 70, 'data': {'question_count': len(questions)}})}\n\n"
+            yield _sse_event({'step': 'generate_questions', 'message': f'已生成 {len(questions)} 道题目', 'progress': 70, 'data': {'question_count': len(questions)}})
             
             # Step 4: Compile metadata
-            yield f"data: {json.dumps({'step': 'compile_metadata', 'message': '编译试卷信息...', 'progress': 70})}\n\n"
+            yield _sse_event({'step': 'compile_metadata', 'message': '编译试卷信息...', 'progress': 70})
             
-            from agent.exam_graph import compile_exam_metadata
-            metadata_state = compile_exam_metadata(initial_state, config)
+            metadata_state = await compile_exam_metadata(initial_state, config)
             initial_state.update(metadata_state)
             
             title = initial_state.get("exam_title", "")
-            yield f"data: {json.dumps({'step': 'compile_metadata', 'message': '试卷信息编译完成', 'progress': 75, 'data': {'title': title}})}\n\n"
+            yield _sse_event({'step': 'compile_metadata', 'message': '试卷信息编译完成', 'progress': 75, 'data': {'title': title}})
             
             # Step 5: Generate study notes
-            yield f"data: {json.dumps({'step': 'generate_notes', 'message': '生成学习笔记...', 'progress': 80})}\n\n"
+            yield _sse_event({'step': 'generate_notes', 'message': '生成学习笔记...', 'progress': 80})
             
-            from agent.exam_graph import generate_study_notes
-            notes_state = generate_study_notes(initial_state, config)
+            notes_state = await generate_study_notes(initial_state, config)
             initial_state.update(notes_state)
             
-            yield f"data: {json.dumps({'step': 'generate_notes', 'message': '学习笔记生成完成', 'progress': 85})}\n\n"
+            yield _sse_event({'step': 'generate_notes', 'message': '学习笔记生成完成', 'progress': 85})
             
             # Step 6: Generate PDF
-            yield f"data: {json.dumps({'step': 'generate_pdf', 'message': '生成PDF文件...', 'progress': 90})}\n\n"
+            yield _sse_event({'step': 'generate_pdf', 'message': '生成PDF文件...', 'progress': 90})
             
-            from agent.exam_graph import generate_pdf
             pdf_state = await generate_pdf(initial_state, config)
             initial_state.update(pdf_state)
             
@@ -211,33 +257,50 @@ async def generate_exam_stream(request: ExamRequest):
                 'study_notes': initial_state.get('study_notes', {})
             }
             
-            yield f"data: {json.dumps({'step': 'completed', 'message': '试卷生成完成！', 'progress': 100, 'result': result})}\n\n"
+            yield _sse_event({'step': 'completed', 'message': '试卷生成完成！', 'progress': 100, 'result': result})
             
         except Exception as e:
-            import traceback
             error_msg = f"生成失败: {str(e)}"
             print(f"Error in exam generation: {traceback.format_exc()}")
-            yield f"data: {json.dumps({'step': 'error', 'message': error_msg, 'progress': 0, 'error': str(e)})}\n\n"
+            yield _sse_event({'step': 'error', 'message': error_msg, 'progress': 0, 'error': str(e)})
     
-    return StreamingResponse(generate(), media_type="text/plain")
+    return StreamingResponse(
+        _coalesce_sse(generate()),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Connection": "keep-alive"
+        }
+    )
+
+
+def _resolve_generated_file(filename: str):
+    """Resolve a file inside generated_exams, rejecting paths that escape it."""
+    base_dir = os.path.abspath("generated_exams")
+    file_path = os.path.abspath(os.path.join(base_dir, filename))
+    if os.path.commonpath([base_dir, file_path]) != base_dir:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    try:
+        file_stats = os.stat(file_path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(file_stats.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    return file_path, file_stats
 
 
 # API endpoint to download generated PDF
 @app.get("/download-pdf/{filename}")
 async def download_pdf(filename: str):
     """Download a generated PDF file."""
-    
-    def _check_file():
-        file_path = os.path.join("generated_exams", filename)
-        return file_path, os.path.exists(file_path)
-    
-    file_path, exists = await asyncio.to_thread(_check_file)
-    
-    if not exists:
-        raise HTTPException(status_code=404, detail="File not found")
+    file_path, file_stats = _resolve_generated_file(filename)
     
     return FileResponse(
         path=file_path,
+        stat_result=file_stats,
         filename=filename,
         media_type="application/pdf",
         headers={"Content-Disposition": "attachment"}
@@ -247,18 +310,11 @@ async def download_pdf(filename: str):
 @app.get("/preview-pdf/{filename}")
 async def preview_pdf(filename: str):
     """Preview a generated PDF file inline in browser."""
-    
-    def _check_file():
-        file_path = os.path.join("generated_exams", filename)
-        return file_path, os.path.exists(file_path)
-    
-    file_path, exists = await asyncio.to_thread(_check_file)
-    
-    if not exists:
-        raise HTTPException(status_code=404, detail="File not found")
+    file_path, file_stats = _resolve_generated_file(filename)
     
     return FileResponse(
         path=file_path,
+        stat_result=file_stats,
         media_type="application/pdf",
         headers={
             "Content-Disposition": "inline",
@@ -278,15 +334,15 @@ async def list_exams():
             return []
         
         files = []
-        for filename in os.listdir(exam_dir):
-            if filename.endswith('.pdf'):
-                file_path = os.path.join(exam_dir, filename)
-                file_stats = os.stat(file_path)
-                files.append({
-                    "filename": filename,
-                    "size": file_stats.st_size,
-                    "created": file_stats.st_ctime
-                })
+        with os.scandir(exam_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.pdf') and entry.is_file():
+                    file_stats = entry.stat()
+                    files.append({
+                        "filename": entry.name,
+                        "size": file_stats.st_size,
+                        "created": file_stats.st_ctime
+                    })
         return files
     
     files = await asyncio.to_thread(_list_files)
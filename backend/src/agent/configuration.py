@@ -1,5 +1,6 @@
 import os
-from pydantic import BaseModel, Field
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Any, Optional
 
 from langchain_core.runnables import RunnableConfig
@@ -8,6 +9,9 @@ from langchain_core.runnables import RunnableConfig
 class Configuration(BaseModel):
     """The configuration for the agent."""
 
+    # 实例会被 _cached_configuration 跨调用共享，必须不可变
+    model_config = ConfigDict(frozen=True)
+
     # OpenAI Compatible API Configuration
     openai_api_key: str = Field(
         default_factory=lambda: os.getenv("OPENAI_API_KEY", ""),
@@ -50,6 +54,13 @@ class Configuration(BaseModel):
         metadata={"description": "The maximum number of research loops to perform."},
     )
 
+    use_cache: bool = Field(
+        default=False,
+        metadata={
+            "description": "Whether to reuse cached exam node outputs for identical inputs."
+        },
+    )
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
@@ -62,10 +73,25 @@ class Configuration(BaseModel):
         # Get raw values from environment or config
         raw_values: dict[str, Any] = {
             name: os.environ.get(name.upper(), configurable.get(name))
-            for name in cls.model_fields.keys()
+            for name in _FIELD_NAMES
         }
 
         # Filter out None values
-        values = {k: v for k, v in raw_values.items() if v is not None}
+        values = tuple((k, v) for k, v in raw_values.items() if v is not None)
+
+        try:
+            return _cached_configuration(cls, values)
+        except TypeError:
+            # Unhashable configurable values cannot be cached
+            return cls(**dict(values))
+
+
+_FIELD_NAMES = tuple(Configuration.model_fields.keys())
+
 
-        return cls(**values)
+@lru_cache(maxsize=64)
+def _cached_configuration(
+    cls: type[Configuration], values: tuple[tuple[str, Any], ...]
+) -> Configuration:
+    """Build (and memoize) a Configuration for a given set of resolved values."""
+    return cls(**dict(values))
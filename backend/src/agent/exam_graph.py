@@ -1,9 +1,17 @@
 """LangGraph implementation for exam generation."""
 
 import os
+import sys
 import asyncio
+import functools
+import hashlib
+import multiprocessing
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from types import MappingProxyType
 from typing import List, Dict, Any
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import Send
@@ -18,65 +26,165 @@ from agent.exam_tools_and_schemas import (
     ExamGenerationRequest
 )
 from agent.notes_schemas import StudyNotes
-from agent.notes_prompts import notes_generator_instructions
-from agent.notes_pdf_generator import StudyNotesPDFGenerator
+from agent.notes_prompts import notes_generator_instructions, notes_generator_template
 from agent.exam_prompts import (
     research_topic_generator_instructions,
+    research_topic_generator_request,
+    research_topic_generator_template,
     knowledge_researcher_instructions,
+    knowledge_researcher_request,
+    knowledge_researcher_template,
     question_generator_instructions,
-    exam_compiler_instructions
+    question_generator_request,
+    question_generator_template,
+    exam_compiler_instructions,
+    exam_compiler_request,
+    exam_compiler_template
 )
 from agent.prompts import get_current_date
 from agent.configuration import Configuration
-from agent.pdf_generator import ExamPDFGenerator
+from agent.invocation_cache import invocation_cache
 
+# 学段和学科描述
+_EDUCATION_DESC = MappingProxyType({
+    "primary": "小学(1-6年级)",
+    "middle": "初中(7-9年级)",
+    "high": "高中(10-12年级)"
+})
 
-def generate_research_topics(state: ExamGenerationState, config: RunnableConfig) -> Dict[str, Any]:
+_SUBJECT_DESC = MappingProxyType({
+    "chinese": "语文", "math": "数学", "english": "英语",
+    "physics": "物理", "chemistry": "化学", "biology": "生物",
+    "history": "历史", "geography": "地理", "politics": "政治/道德与法治",
+    "science": "科学", "moral": "道德与法治", "art": "美术",
+    "music": "音乐", "pe": "体育", "technology": "信息技术"
+})
+
+
+# 题目中可省略的字段
+_OPTIONAL_QUESTION_FIELDS = frozenset({"options", "correct_answer", "explanation"})
+
+
+# 限制同时进行的研究请求数量，避免大量主题时压垮上游API
+_MAX_CONCURRENT_RESEARCH = 8
+_research_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _research_semaphore() -> asyncio.Semaphore:
+    """Return the research semaphore for the running event loop.
+    
+    asyncio primitives bind to the loop that first waits on them, so each
+    loop (langgraph dev, tests, repeated asyncio.run) gets its own.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _research_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _research_semaphores[loop] = asyncio.Semaphore(_MAX_CONCURRENT_RESEARCH)
+    return semaphore
+
+
+@functools.lru_cache(maxsize=32)
+def _get_llm(model: str, temperature: float, api_key: str, base_url: str) -> ChatOpenAI:
+    """Return a shared ChatOpenAI client so HTTP connections are reused across calls."""
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_retries=2,
+        api_key=api_key,
+        base_url=base_url,
+    )
+
+
+def dedupe_topics(topics: List[str]) -> List[str]:
+    """Drop empty and near-duplicate topics (ignoring case and whitespace), keeping order."""
+    unique_topics: Dict[str, str] = {}
+    for topic in topics:
+        canonical = " ".join(topic.split()).casefold()
+        if canonical and canonical not in unique_topics:
+            unique_topics[canonical] = topic.strip()
+    return list(unique_topics.values())
+
+
+def _prompt_messages(instructions: str, request: str) -> List[BaseMessage]:
+    """Build a chat prompt with the static instructions first so their prefix can be cached."""
+    return [SystemMessage(content=instructions), HumanMessage(content=request)]
+
+
+def get_combined_research(state: ExamGenerationState) -> str:
+    """Return all research content joined into one prompt section, reusing a cached join."""
+    combined_research = state.get("combined_research")
+    if combined_research is None:
+        combined_research = "\n\n---\n\n".join(state.get("research_content", []))
+    return combined_research
+
+
+def _memoized_node(*state_keys: str, prompts: tuple[str, ...]):
+    """Cache a node's result on the given state keys, its prompts, the date, the models and the API endpoint."""
+    # 提示词修改后旧的缓存结果自动失效
+    prompt_hash = hashlib.blake2b("\0".join(prompts).encode(), digest_size=16).hexdigest()
+
+    def decorator(node):
+        @functools.wraps(node)
+        async def wrapper(state, config: RunnableConfig) -> Dict[str, Any]:
+            configurable = Configuration.from_runnable_config(config)
+            if not configurable.use_cache:
+                return await node(state, config)
+
+            inputs = {key: state.get(key) for key in state_keys}
+            inputs["prompt"] = prompt_hash
+            inputs["current_date"] = get_current_date()
+            inputs["models"] = [configurable.query_generator_model, configurable.answer_model]
+            # 不同服务商可能提供同名模型，结果不能共用
+            inputs["base_url"] = configurable.openai_base_url
+            cache_key = invocation_cache.make_key(node.__name__, inputs)
+
+            cached = invocation_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            result = await node(state, config)
+            invocation_cache.set(cache_key, result)
+            return result
+        return wrapper
+    return decorator
+
+
+@_memoized_node(
+    "education_level", "subject", "knowledge_topic", "difficulty_level", "question_count",
+    prompts=(research_topic_generator_instructions, research_topic_generator_request),
+)
+async def generate_research_topics(state: ExamGenerationState, config: RunnableConfig) -> Dict[str, Any]:
     """Generate research topics for the knowledge area."""
     configurable = Configuration.from_runnable_config(config)
     
-    llm = ChatOpenAI(
-        model=configurable.query_generator_model,
-        temperature=0.7,
-        max_retries=2,
-        api_key=configurable.openai_api_key,
-        base_url=configurable.openai_base_url,
+    llm = _get_llm(
+        configurable.query_generator_model,
+        0.7,
+        configurable.openai_api_key,
+        configurable.openai_base_url,
     )
     
-    structured_llm = llm.with_structured_output(ResearchTopicList)
+    structured_llm = llm.with_structured_output(ResearchTopicList, method="json_mode")
     
     # Determine number of topics based on question count
     num_topics = min(max(3, state["question_count"] // 3), 8)
     
-    # 获取学段和学科描述
-    education_descriptions = {
-        "primary": "小学(1-6年级)",
-        "middle": "初中(7-9年级)", 
-        "high": "高中(10-12年级)"
-    }
-    
-    subject_descriptions = {
-        "chinese": "语文", "math": "数学", "english": "英语",
-        "physics": "物理", "chemistry": "化学", "biology": "生物",
-        "history": "历史", "geography": "地理", "politics": "政治/道德与法治",
-        "science": "科学", "moral": "道德与法治", "art": "美术",
-        "music": "音乐", "pe": "体育", "technology": "信息技术"
-    }
-    
-    formatted_prompt = research_topic_generator_instructions.format(
+    formatted_prompt = research_topic_generator_template(
         current_date=get_current_date(),
         education_level=state["education_level"],
-        education_level_desc=education_descriptions.get(state["education_level"], state["education_level"]),
+        education_level_desc=_EDUCATION_DESC.get(state["education_level"], state["education_level"]),
         subject=state["subject"],
-        subject_desc=subject_descriptions.get(state["subject"], state["subject"]),
+        subject_desc=_SUBJECT_DESC.get(state["subject"], state["subject"]),
         knowledge_topic=state["knowledge_topic"],
         difficulty_level=state["difficulty_level"],
         question_count=state["question_count"],
         num_topics=num_topics
     )
     
-    result = structured_llm.invoke(formatted_prompt)
-    return {"research_topics": result.topics}
+    result = await structured_llm.ainvoke(_prompt_messages(research_topic_generator_instructions, formatted_prompt))
+    return {"research_topics": dedupe_topics(result.topics)}
 
 
 def continue_to_research(state: ExamGenerationState):
@@ -97,19 +205,22 @@ def continue_to_research(state: ExamGenerationState):
     ]
 
 
-def research_knowledge(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+@_memoized_node(
+    "research_topic", "main_topic", "difficulty_level",
+    prompts=(knowledge_researcher_instructions, knowledge_researcher_request),
+)
+async def research_knowledge(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
     """Research knowledge for a specific topic."""
     configurable = Configuration.from_runnable_config(config)
     
-    llm = ChatOpenAI(
-        model=configurable.query_generator_model,
-        temperature=0.3,
-        max_retries=2,
-        api_key=configurable.openai_api_key,
-        base_url=configurable.openai_base_url,
+    llm = _get_llm(
+        configurable.query_generator_model,
+        0.3,
+        configurable.openai_api_key,
+        configurable.openai_base_url,
     )
     
-    formatted_prompt = knowledge_researcher_instructions.format(
+    formatted_prompt = knowledge_researcher_template(
         current_date=get_current_date(),
         education_level=state.get("education_level", "middle"),
         subject=state.get("subject", "math"),
@@ -118,31 +229,34 @@ def research_knowledge(state: Dict[str, Any], config: RunnableConfig) -> Dict[st
         difficulty_level=state["difficulty_level"]
     )
     
-    response = llm.invoke(formatted_prompt)
+    async with _research_semaphore():
+        response = await llm.ainvoke(_prompt_messages(knowledge_researcher_instructions, formatted_prompt))
     
     return {
         "research_content": [response.content]
     }
 
 
-def generate_questions(state: ExamGenerationState, config: RunnableConfig) -> Dict[str, Any]:
+@_memoized_node(
+    "knowledge_topic", "difficulty_level", "question_types", "question_count", "research_content",
+    prompts=(question_generator_instructions, question_generator_request),
+)
+async def generate_questions(state: ExamGenerationState, config: RunnableConfig) -> Dict[str, Any]:
     """Generate exam questions based on research content."""
     configurable = Configuration.from_runnable_config(config)
     
-    llm = ChatOpenAI(
-        model=configurable.answer_model,
-        temperature=0.5,
-        max_retries=2,
-        api_key=configurable.openai_api_key,
-        base_url=configurable.openai_base_url,
+    llm = _get_llm(
+        configurable.answer_model,
+        0.5,
+        configurable.openai_api_key,
+        configurable.openai_base_url,
     )
     
     structured_llm = llm.with_structured_output(ExamQuestionList)
     
-    # Combine all research content
-    combined_research = "\n\n---\n\n".join(state.get("research_content", []))
+    combined_research = get_combined_research(state)
     
-    formatted_prompt = question_generator_instructions.format(
+    formatted_prompt = question_generator_template(
         current_date=get_current_date(),
         knowledge_topic=state["knowledge_topic"],
         difficulty_level=state["difficulty_level"],
@@ -151,43 +265,38 @@ def generate_questions(state: ExamGenerationState, config: RunnableConfig) -> Di
         research_content=combined_research
     )
     
-    result = structured_llm.invoke(formatted_prompt)
-    
-    # Convert questions to dict format
-    questions = []
-    for q in result.questions:
-        question_dict = {
-            "question_id": q.question_id,
-            "question_type": q.question_type,
-            "question_text": q.question_text,
-            "points": q.points
-        }
-        if q.options:
-            question_dict["options"] = q.options
-        if q.correct_answer:
-            question_dict["correct_answer"] = q.correct_answer
-        if q.explanation:
-            question_dict["explanation"] = q.explanation
-        questions.append(question_dict)
-    
-    return {"generated_questions": questions}
-
-
-def compile_exam_metadata(state: ExamGenerationState, config: RunnableConfig) -> Dict[str, Any]:
+    result = await structured_llm.ainvoke(_prompt_messages(question_generator_instructions, formatted_prompt))
+    
+    # Convert questions to dict format, dropping empty optional fields
+    questions = [
+        {key: value for key, value in q.items() if value or key not in _OPTIONAL_QUESTION_FIELDS}
+        for q in result.model_dump()["questions"]
+    ]
+    # 题型取值有限，驻留后所有题目共享同一个字符串对象
+    for q in questions:
+        q["question_type"] = sys.intern(q["question_type"])
+    
+    return {"generated_questions": questions, "combined_research": combined_research}
+
+
+@_memoized_node(
+    "knowledge_topic", "difficulty_level", "question_types", "generated_questions",
+    prompts=(exam_compiler_instructions, exam_compiler_request),
+)
+async def compile_exam_metadata(state: ExamGenerationState, config: RunnableConfig) -> Dict[str, Any]:
     """Generate exam title and instructions."""
     configurable = Configuration.from_runnable_config(config)
     
-    llm = ChatOpenAI(
-        model=configurable.answer_model,
-        temperature=0.3,
-        max_retries=2,
-        api_key=configurable.openai_api_key,
-        base_url=configurable.openai_base_url,
+    llm = _get_llm(
+        configurable.answer_model,
+        0.3,
+        configurable.openai_api_key,
+        configurable.openai_base_url,
     )
     
-    structured_llm = llm.with_structured_output(ExamMetadata)
+    structured_llm = llm.with_structured_output(ExamMetadata, method="json_mode")
     
-    formatted_prompt = exam_compiler_instructions.format(
+    formatted_prompt = exam_compiler_template(
         current_date=get_current_date(),
         knowledge_topic=state["knowledge_topic"],
         difficulty_level=state["difficulty_level"],
@@ -195,7 +304,7 @@ def compile_exam_metadata(state: ExamGenerationState, config: RunnableConfig) ->
         question_types=", ".join(state["question_types"])
     )
     
-    result = structured_llm.invoke(formatted_prompt)
+    result = await structured_llm.ainvoke(_prompt_messages(exam_compiler_instructions, formatted_prompt))
     
     return {
         "exam_title": result.title,
@@ -203,148 +312,130 @@ def compile_exam_metadata(state: ExamGenerationState, config: RunnableConfig) ->
     }
 
 
-def generate_study_notes(state: ExamGenerationState, config: RunnableConfig) -> Dict[str, Any]:
+@_memoized_node(
+    "education_level", "subject", "knowledge_topic", "difficulty_level", "research_content",
+    prompts=(notes_generator_instructions,),
+)
+async def generate_study_notes(state: ExamGenerationState, config: RunnableConfig) -> Dict[str, Any]:
     """Generate study notes based on research content."""
     configurable = Configuration.from_runnable_config(config)
     
-    llm = ChatOpenAI(
-        model=configurable.answer_model,
-        temperature=0.3,
-        max_retries=2,
-        api_key=configurable.openai_api_key,
-        base_url=configurable.openai_base_url,
+    llm = _get_llm(
+        configurable.answer_model,
+        0.3,
+        configurable.openai_api_key,
+        configurable.openai_base_url,
     )
     
     structured_llm = llm.with_structured_output(StudyNotes)
     
-    # 获取学段和学科描述
-    education_descriptions = {
-        "primary": "小学(1-6年级)",
-        "middle": "初中(7-9年级)", 
-        "high": "高中(10-12年级)"
-    }
-    
-    subject_descriptions = {
-        "chinese": "语文", "math": "数学", "english": "英语",
-        "physics": "物理", "chemistry": "化学", "biology": "生物",
-        "history": "历史", "geography": "地理", "politics": "政治/道德与法治",
-        "science": "科学", "moral": "道德与法治", "art": "美术",
-        "music": "音乐", "pe": "体育", "technology": "信息技术"
-    }
-    
-    # Combine all research content
-    combined_research = "\n\n---\n\n".join(state.get("research_content", []))
+    combined_research = get_combined_research(state)
     
-    formatted_prompt = notes_generator_instructions.format(
+    formatted_prompt = notes_generator_template(
         current_date=get_current_date(),
         education_level=state["education_level"],
-        education_level_desc=education_descriptions.get(state["education_level"], state["education_level"]),
+        education_level_desc=_EDUCATION_DESC.get(state["education_level"], state["education_level"]),
         subject=state["subject"],
-        subject_desc=subject_descriptions.get(state["subject"], state["subject"]),
+        subject_desc=_SUBJECT_DESC.get(state["subject"], state["subject"]),
         knowledge_topic=state["knowledge_topic"],
         difficulty_level=state["difficulty_level"],
         research_content=combined_research
     )
     
-    result = structured_llm.invoke(formatted_prompt)
+    result = await structured_llm.ainvoke(formatted_prompt)
     
     # Convert to dict format
-    notes_data = {
-        "topic_overview": result.topic_overview,
-        "learning_objectives": result.learning_objectives,
-        "knowledge_points": [kp.dict() for kp in result.knowledge_points],
-        "study_tips": [tip.dict() for tip in result.study_tips],
-        "extended_knowledge": [ek.dict() for ek in result.extended_knowledge],
-        "summary": result.summary,
-        "knowledge_structure": result.knowledge_structure,
-        "practice_recommendations": [pr.dict() for pr in result.practice_recommendations],
-        "learning_resources": [lr.dict() for lr in result.learning_resources],
-        "faqs": [faq.dict() for faq in result.faqs],
-        "self_assessment": result.self_assessment
-    }
+    notes_data = result.model_dump(mode="json")
     
     return {"study_notes": notes_data}
 
 
+@functools.lru_cache(maxsize=1024)
+def create_safe_filename(topic: str, max_length: int = 50) -> str:
+    """Create a safe filename from topic string."""
+    # Remove special characters and keep only alphanumeric, spaces, hyphens, underscores
+    safe_chars = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_', '.')).strip()
+    
+    # Replace multiple spaces with single space
+    safe_chars = ' '.join(safe_chars.split())
+    
+    # Replace spaces with underscores
+    safe_chars = safe_chars.replace(' ', '_')
+    
+    # Limit length and ensure it doesn't end with underscore
+    if len(safe_chars) > max_length:
+        safe_chars = safe_chars[:max_length].rstrip('_')
+    
+    # If empty or too short, use default
+    if len(safe_chars) < 3:
+        safe_chars = "exam"
+    
+    return safe_chars
+
+
+@functools.lru_cache(maxsize=None)
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Return the process pool used for CPU-bound PDF rendering.
+
+    Workers are spawned rather than forked so they do not inherit the
+    event loop or open HTTP connections of the server process.
+    """
+    return ProcessPoolExecutor(
+        max_workers=os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
 async def generate_pdf(state: ExamGenerationState, config: RunnableConfig) -> Dict[str, Any]:
     """Generate PDF files for exam and study notes."""
+    # Create output directory
+    output_dir = "generated_exams"
+    os.makedirs(output_dir, exist_ok=True)
+    
+    safe_topic = create_safe_filename(state["knowledge_topic"])
+    
+    # Add timestamp to ensure uniqueness
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    file_prefix = f"{safe_topic}_{state['difficulty_level']}_{timestamp}"
+    
+    exam_pdf_path = os.path.join(output_dir, f"{file_prefix}_exam.pdf")
+    answer_key_path = os.path.join(output_dir, f"{file_prefix}_answer_key.pdf")
+    notes_pdf_path = os.path.join(output_dir, f"{file_prefix}_notes.pdf")
     
-    def _create_pdfs():
-        """Synchronous PDF creation function to run in thread."""
-        # Create output directory
-        output_dir = "generated_exams"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Generate safe filename
-        def create_safe_filename(topic: str, max_length: int = 50) -> str:
-            """Create a safe filename from topic string."""
-            # Remove special characters and keep only alphanumeric, spaces, hyphens, underscores
-            safe_chars = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_', '.')).strip()
-            
-            # Replace multiple spaces with single space
-            safe_chars = ' '.join(safe_chars.split())
-            
-            # Replace spaces with underscores
-            safe_chars = safe_chars.replace(' ', '_')
-            
-            # Limit length and ensure it doesn't end with underscore
-            if len(safe_chars) > max_length:
-                safe_chars = safe_chars[:max_length].rstrip('_')
-            
-            # If empty or too short, use default
-            if len(safe_chars) < 3:
-                safe_chars = "exam"
-            
-            return safe_chars
-        
-        safe_topic = create_safe_filename(state["knowledge_topic"])
-        
-        # Add timestamp to ensure uniqueness
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Generate exam PDFs
-        exam_filename = f"{safe_topic}_{state['difficulty_level']}_{timestamp}_exam.pdf"
-        exam_pdf_path = os.path.join(output_dir, exam_filename)
-        
-        pdf_generator = ExamPDFGenerator()
-        actual_exam_path = pdf_generator.generate_exam_pdf(
+    # reportlab与字体只在真正渲染PDF时加载，不拖慢服务启动；生成器在各工作进程中各建一次
+    from agent.notes_pdf_generator import render_study_notes_pdf
+    from agent.pdf_generator import render_exam_pdf
+    
+    loop = asyncio.get_running_loop()
+    pdf_pool = _get_pdf_pool()
+    
+    # The three documents are independent and CPU-bound, so render them in parallel processes
+    actual_exam_path, answer_key_path, actual_notes_path = await asyncio.gather(
+        loop.run_in_executor(pdf_pool, functools.partial(
+            render_exam_pdf,
             exam_title=state["exam_title"],
             instructions=state["exam_instructions"],
             questions=state["generated_questions"],
             output_path=exam_pdf_path,
             include_answers=False
-        )
-        
-        # Generate answer key
-        answer_key_filename = f"{safe_topic}_{state['difficulty_level']}_{timestamp}_answer_key.pdf"
-        answer_key_path = os.path.join(output_dir, answer_key_filename)
-        
-        pdf_generator.generate_exam_pdf(
+        )),
+        loop.run_in_executor(pdf_pool, functools.partial(
+            render_exam_pdf,
             exam_title=f"{state['exam_title']} - Answer Key",
             instructions=state["exam_instructions"],
             questions=state["generated_questions"],
             output_path=answer_key_path,
             include_answers=True
-        )
-        
-        # Generate study notes PDF
-        notes_filename = f"{safe_topic}_{state['difficulty_level']}_{timestamp}_notes.pdf"
-        notes_pdf_path = os.path.join(output_dir, notes_filename)
-        
-        notes_generator = StudyNotesPDFGenerator()
-        actual_notes_path = notes_generator.generate_study_notes_pdf(
+        )),
+        loop.run_in_executor(pdf_pool, functools.partial(
+            render_study_notes_pdf,
             notes_data=state.get("study_notes", {}),
             topic=state["knowledge_topic"],
             subject=state.get("subject", ""),
             education_level=state.get("education_level", ""),
             output_path=notes_pdf_path
-        )
-        
-        return actual_exam_path, answer_key_path, actual_notes_path
-    
-    # Run PDF generation in a separate thread to avoid blocking
-    actual_exam_path, answer_key_path, actual_notes_path = await asyncio.to_thread(_create_pdfs)
+        )),
+    )
     
     return {
         "pdf_path": actual_exam_path,
@@ -1,16 +1,40 @@
 """Prompt templates for exam generation."""
 
-research_topic_generator_instructions = """你是一位专业的教育专家，负责为创建综合性考试确定关键研究主题。
+from string import Formatter
+from typing import Callable
 
-当前日期：{current_date}
 
-学段：{education_level} ({education_level_desc})
-学科：{subject} ({subject_desc})
-知识主题：{knowledge_topic}
-难度等级：{difficulty_level}
-需要的题目数量：{question_count}
+def compile_template(template: str) -> Callable[..., str]:
+    """Precompile a ``str.format``-style template into a render function.
+
+    The template is parsed once into literal segments and field names; the
+    returned callable only concatenates them, so rendering does not re-parse
+    the format string on every call.
+    """
+    segments = []
+    for literal, field_name, format_spec, conversion in Formatter().parse(template):
+        if format_spec or conversion:
+            raise ValueError(f"Unsupported format spec in template field: {field_name}")
+        segments.append((literal, field_name))
+
+    def render(**kwargs) -> str:
+        parts = []
+        for literal, field_name in segments:
+            parts.append(literal)
+            if field_name is not None:
+                parts.append(str(kwargs[field_name]))
+        return "".join(parts)
 
-你的任务是生成{num_topics}个具体的研究主题，这些主题将帮助收集全面的信息，以创建关于"{knowledge_topic}"的高质量考试题目。
+    return render
+
+
+# Each prompt is split into static instructions (sent as the system message,
+# identical across calls so provider-side prefix caching can reuse it) and a
+# request template holding every per-call value, including the current date.
+
+research_topic_generator_instructions = """你是一位专业的教育专家，负责为创建综合性考试确定关键研究主题。
+
+你的任务是根据给定的学段、学科、知识主题和难度等级，生成指定数量的具体研究主题，这些主题将帮助收集全面的信息，以创建关于该知识主题的高质量考试题目。
 
 请根据学段特点考虑以下方面：
 - 符合该学段学生的认知水平和知识结构
@@ -21,23 +45,26 @@ research_topic_generator_instructions = """你是一位专业的教育专家，
 - 与其他知识点的关联
 
 生成的主题应该：
-1. 适合{education_level}学段的学习特点
-2. 体现{subject}学科的核心素养
-3. 覆盖"{knowledge_topic}"的重要方面
+1. 适合给定学段的学习特点
+2. 体现该学科的核心素养
+3. 覆盖知识主题的重要方面
 4. 能够生成多样化的题目类型
 
-请以JSON列表格式返回主题。"""
+请以JSON对象格式返回，仅包含一个"topics"字段，其值为主题字符串列表。"""
 
-knowledge_researcher_instructions = """你是一位专业的研究员，负责收集关于特定主题的全面信息。
+research_topic_generator_request = """当前日期：{current_date}
 
-当前日期：{current_date}
+学段：{education_level} ({education_level_desc})
+学科：{subject} ({subject_desc})
+知识主题：{knowledge_topic}
+难度等级：{difficulty_level}
+需要的题目数量：{question_count}
 
-学段：{education_level}
-学科：{subject}
-研究主题：{research_topic}
-背景：这项研究将用于创建关于"{main_topic}"的{difficulty_level}难度等级的考试题目。
+请生成{num_topics}个具体的研究主题，用于创建关于"{knowledge_topic}"的考试题目。"""
 
-你的任务是提供关于研究主题的详细、准确和全面的信息。请根据学段特点包括：
+knowledge_researcher_instructions = """你是一位专业的研究员，负责收集关于特定主题的全面信息。
+
+你的任务是提供关于给定研究主题的详细、准确和全面的信息。请根据学段特点包括：
 
 1. 关键概念和定义（适合该学段理解水平）
 2. 重要事实和数据
@@ -47,7 +74,7 @@ knowledge_researcher_instructions = """你是一位专业的研究员，负责
 6. 与其他知识点的联系
 
 请特别注意：
-- 内容应符合{education_level}学段的认知特点
+- 内容应符合给定学段的认知特点
 - 语言表达要适合该年龄段学生
 - 举例要贴近学生生活经验
 - 重点突出学科核心素养
@@ -57,23 +84,20 @@ knowledge_researcher_instructions = """你是一位专业的研究员，负责
 
 信息应该准确、结构良好，并适合指定的学段和难度等级。请用中文回答。"""
 
-question_generator_instructions = """你是一位专业的考试题目编写专家，负责创建高质量的评估题目。
-
-当前日期：{current_date}
+knowledge_researcher_request = """当前日期：{current_date}
 
-主题：{knowledge_topic}
-难度等级：{difficulty_level}
-要包含的题目类型：{question_types}
-题目数量：{question_count}
+学段：{education_level}
+学科：{subject}
+研究主题：{research_topic}
+背景：这项研究将用于创建关于"{main_topic}"的{difficulty_level}难度等级的考试题目。"""
 
-研究内容：
-{research_content}
+question_generator_instructions = """你是一位专业的考试题目编写专家，负责创建高质量的评估题目。
 
-你的任务是基于提供的研究内容创建{question_count}道多样化、高质量的考试题目。
+你的任务是基于提供的研究内容，按指定的数量、难度等级和题目类型创建多样化、高质量的考试题目。
 
 题目创建指南：
-1. 确保题目适合{difficulty_level}难度等级
-2. 创建指定类型的题目组合：{question_types}
+1. 确保题目适合指定的难度等级
+2. 创建指定类型的题目组合
 3. 每道题目应测试知识的不同方面（记忆、理解、应用、分析）
 4. 提供清晰、明确的题目文本
 5. 对于选择题，包含4个选项，只有一个正确答案
@@ -96,16 +120,21 @@ question_generator_instructions = """你是一位专业的考试题目编写专
 
 请以指定的JSON格式返回题目。"""
 
-exam_compiler_instructions = """你是一位专业的考试设计专家，负责创建全面的考试说明和元数据。
-
-当前日期：{current_date}
+question_generator_request = """当前日期：{current_date}
 
-考试主题：{knowledge_topic}
+主题：{knowledge_topic}
 难度等级：{difficulty_level}
-总题数：{question_count}
-题目类型：{question_types}
+要包含的题目类型：{question_types}
+题目数量：{question_count}
 
-你的任务是创建：
+研究内容：
+{research_content}
+
+请基于以上研究内容创建{question_count}道考试题目。"""
+
+exam_compiler_instructions = """你是一位专业的考试设计专家，负责创建全面的考试说明和元数据。
+
+你的任务是根据给定的考试信息创建：
 1. 合适的考试标题
 2. 清晰、全面的考试说明
 3. 建议的考试时间
@@ -118,4 +147,24 @@ exam_compiler_instructions = """你是一位专业的考试设计专家，负责
 - 允许/不允许使用的材料
 - 提交指南
 
-使说明清晰、专业，并适合包含的难度等级和题目类型。请使用中文。"""
\ No newline at end of file
+使说明清晰、专业，并适合包含的难度等级和题目类型。请使用中文。
+
+请以JSON对象格式返回，包含以下字段：
+- "title"：考试标题（字符串）
+- "instructions"：考试说明（字符串）
+- "total_points"：总分（整数）
+- "time_limit"：建议考试时间（字符串）"""
+
+exam_compiler_request = """当前日期：{current_date}
+
+考试主题：{knowledge_topic}
+难度等级：{difficulty_level}
+总题数：{question_count}
+题目类型：{question_types}"""
+
+
+# Precompiled request templates
+research_topic_generator_template = compile_template(research_topic_generator_request)
+knowledge_researcher_template = compile_template(knowledge_researcher_request)
+question_generator_template = compile_template(question_generator_request)
+exam_compiler_template = compile_template(exam_compiler_request)
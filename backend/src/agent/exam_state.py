@@ -1,13 +1,14 @@
 """State definitions for the exam generation agent."""
 
+import operator
 from typing import Annotated, List, Dict, Any, Optional
 from typing_extensions import TypedDict
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
 
 
-class ExamGenerationState(TypedDict):
-    """State for exam generation process."""
+class ExamCoreState(TypedDict):
+    """Small, frequently read exam request fields."""
     messages: Annotated[List[BaseMessage], add_messages]
     education_level: str  # "primary", "middle", "high"
     subject: str  # subject identifier
@@ -15,16 +16,27 @@ class ExamGenerationState(TypedDict):
     difficulty_level: str  # "easy", "medium", "hard"
     question_count: int
     question_types: List[str]  # ["multiple_choice", "short_answer", "essay", "true_false", "fill_blank", "calculation", "analysis", "application"]
-    research_content: List[str]
+
+
+class ExamArtifacts(TypedDict, total=False):
+    """Large, incrementally produced exam outputs; every key is optional."""
+    research_topics: List[str]
+    research_content: Annotated[List[str], operator.add]  # 并行研究节点的结果合并
+    combined_research: Optional[str]  # research_content joined once for prompts
     generated_questions: List[Dict[str, Any]]
     exam_title: str
     exam_instructions: str
     study_notes: Optional[Dict[str, Any]]  # 添加学习笔记
     pdf_content: Optional[str]
     pdf_path: Optional[str]
+    answer_key_path: Optional[str]
     notes_path: Optional[str]  # 添加笔记PDF路径
 
 
+class ExamGenerationState(ExamCoreState, ExamArtifacts):
+    """State for exam generation process."""
+
+
 class QuestionGenerationState(TypedDict):
     """State for individual question generation."""
     topic: str
@@ -1,11 +1,50 @@
-"""Tools and schemas for exam generation."""
+"""Tools and schemas for exam generation.
 
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+Validate at the boundary, construct internally: LLM output is validated
+once when it is parsed into these models; data that has already been
+validated (cached results, copies, transformations) should be rebuilt
+with ``from_trusted``, which skips validation via ``model_construct``.
+
+All models are frozen. Models filled from LLM output ignore unknown keys,
+so a chatty JSON-mode response still parses; the request model forbids them.
+"""
+
+from enum import StrEnum
+from typing import List, Dict, Any, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field
+import orjson
+
+
+class QuestionType(StrEnum):
+    """Supported question types."""
+    MULTIPLE_CHOICE = "multiple_choice"
+    TRUE_FALSE = "true_false"
+    FILL_BLANK = "fill_blank"
+    SHORT_ANSWER = "short_answer"
+    ESSAY = "essay"
+    CALCULATION = "calculation"
+    APPLICATION = "application"
+    ANALYSIS = "analysis"
+
+
+class Difficulty(StrEnum):
+    """Supported difficulty levels."""
+    EASY = "easy"
+    MEDIUM = "medium"
+    HARD = "hard"
+
+
+class EducationLevel(StrEnum):
+    """Supported education levels."""
+    PRIMARY = "primary"
+    MIDDLE = "middle"
+    HIGH = "high"
 
 
 class ExamQuestion(BaseModel):
     """Schema for a single exam question."""
+    model_config = ConfigDict(frozen=True)
+
     question_id: int = Field(description="Unique identifier for the question")
     question_type: str = Field(description="Type of question: multiple_choice, short_answer, essay, true_false")
     question_text: str = Field(description="The actual question text")
@@ -14,14 +53,30 @@ class ExamQuestion(BaseModel):
     points: int = Field(description="Points awarded for correct answer")
     explanation: Optional[str] = Field(default=None, description="Explanation of the correct answer")
 
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "ExamQuestion":
+        """Build a question from already-validated data without re-validating it."""
+        return cls.model_construct(**data)
+
 
 class ExamQuestionList(BaseModel):
     """Schema for a list of exam questions."""
+    model_config = ConfigDict(frozen=True)
+
     questions: List[ExamQuestion] = Field(description="List of generated exam questions")
 
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "ExamQuestionList":
+        """Build a question list from already-validated data without re-validating it."""
+        return cls.model_construct(
+            questions=[ExamQuestion.from_trusted(q) for q in data.get("questions", [])]
+        )
+
 
 class ExamMetadata(BaseModel):
     """Schema for exam metadata."""
+    model_config = ConfigDict(frozen=True)
+
     title: str = Field(description="Title of the exam")
     instructions: str = Field(description="General instructions for taking the exam")
     total_points: int = Field(description="Total points possible on the exam")
@@ -30,12 +85,26 @@ class ExamMetadata(BaseModel):
 
 class ResearchTopicList(BaseModel):
     """Schema for research topics related to the knowledge area."""
+    model_config = ConfigDict(frozen=True)
+
     topics: List[str] = Field(description="List of specific research topics to gather information about")
 
 
 class ExamGenerationRequest(BaseModel):
     """Schema for exam generation request."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     knowledge_topic: str = Field(description="The main knowledge topic for the exam")
-    difficulty_level: str = Field(description="Difficulty level: easy, medium, or hard")
+    difficulty_level: Difficulty = Field(description="Difficulty level: easy, medium, or hard")
     question_count: int = Field(description="Number of questions to generate")
-    question_types: List[str] = Field(description="Types of questions to include")
\ No newline at end of file
+    question_types: List[QuestionType] = Field(description="Types of questions to include")
+
+
+def dump_questions(questions: ExamQuestionList) -> bytes:
+    """Serialize a question list to JSON bytes."""
+    return orjson.dumps(questions.model_dump())
+
+
+def load_questions(data: Union[bytes, str]) -> ExamQuestionList:
+    """Parse and validate a question list from JSON bytes."""
+    return ExamQuestionList.model_validate_json(data)
@@ -0,0 +1,153 @@
+"""Memoization of exam graph node outputs keyed by their inputs."""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class InvocationCache:
+    """LRU cache of node results, optionally persisted to disk as JSON files.
+
+    Entries expire ``ttl`` seconds after they were stored. Both tiers are
+    bounded: ``maxsize`` caps the in-memory entries and ``max_disk_entries``
+    caps the files kept in ``cache_dir``, evicting the oldest files first.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        cache_dir: Optional[str] = None,
+        max_disk_entries: int = 2048,
+        ttl: float = 24 * 60 * 60,
+    ):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        # 磁盘条目索引（键 -> 写入时间，按写入先后排序），首次访问磁盘时扫描一次
+        self._disk_index: "Optional[OrderedDict[str, float]]" = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(node: str, inputs: Dict[str, Any]) -> str:
+        """Hash a node name and its relevant inputs into a cache key."""
+        payload = orjson.dumps({"node": node, "inputs": inputs}, option=orjson.OPT_SORT_KEYS)
+        return hashlib.blake2b(payload, digest_size=20).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the cached result, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] > self.ttl:
+                    del self._entries[key]
+                    entry = None
+                else:
+                    self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._read_from_disk(key, now)
+            if entry is None:
+                return None
+            self._remember(key, entry)
+        return orjson.loads(entry[1])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a JSON-serializable node result."""
+        entry = (time.time(), orjson.dumps(value))
+        self._remember(key, entry)
+        self._write_to_disk(key, entry)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, entry: Tuple[float, bytes]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_disk_index(self) -> "OrderedDict[str, float]":
+        """Scan cache_dir once and index its files by modification time (caller holds the lock)."""
+        if self._disk_index is None:
+            files = []
+            try:
+                with os.scandir(self.cache_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".json") and entry.is_file():
+                            files.append((entry.stat().st_mtime, entry.name[:-len(".json")]))
+            except OSError:
+                pass
+            files.sort()
+            self._disk_index = OrderedDict((key, mtime) for mtime, key in files)
+        return self._disk_index
+
+    def _remove_from_disk(self, key: str) -> None:
+        try:
+            os.remove(self._path_for(key))
+        except OSError:
+            pass
+
+    def _read_from_disk(self, key: str, now: float) -> Optional[Tuple[float, bytes]]:
+        if not self.cache_dir:
+            return None
+        with self._lock:
+            stored_at = self._load_disk_index().get(key)
+            if stored_at is None:
+                return None
+            if now - stored_at > self.ttl:
+                del self._disk_index[key]
+                self._remove_from_disk(key)
+                return None
+        try:
+            with open(self._path_for(key), "rb") as f:
+                return stored_at, f.read()
+        except OSError:
+            return None
+
+    def _write_to_disk(self, key: str, entry: Tuple[float, bytes]) -> None:
+        if not self.cache_dir:
+            return
+        stored_at, raw = entry
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path_for(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(raw)
+            os.replace(tmp_path, self._path_for(key))
+        except OSError as e:
+            logger.warning("Failed to persist cache entry %s: %s", key, e)
+            return
+        with self._lock:
+            index = self._load_disk_index()
+            index[key] = stored_at
+            index.move_to_end(key)
+            # 只有超过上限时才删除最早写入的文件
+            while len(index) > self.max_disk_entries:
+                oldest, _ = index.popitem(last=False)
+                self._remove_from_disk(oldest)
+
+
+# 全局实例，缓存目录固定在backend/generated_exams/.cache，不随启动目录变化
+invocation_cache = InvocationCache(
+    cache_dir=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "generated_exams",
+        ".cache",
+    )
+)
@@ -1,54 +1,111 @@
 """LaTeX mathematical formula processing for PDF generation."""
 
+import itertools
 import re
-import os
-import tempfile
-from typing import Optional, Tuple
+from functools import cache, lru_cache
+from typing import ClassVar, Dict, FrozenSet, Optional, Tuple
 from io import BytesIO
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib import mathtext
-from PIL import Image
-import numpy as np
+
+
+@cache
+def _configure_matplotlib() -> None:
+    """首次渲染公式时才导入并配置matplotlib，纯文本内容不承担其导入开销。"""
+    import matplotlib
+    
+    # 设置matplotlib支持中文和数学公式
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+
+
+@lru_cache(maxsize=512)
+def _render_cached(latex_text: str, fontsize: int, dpi: int) -> Optional[bytes]:
+    """渲染LaTeX公式为PNG，相同的(公式, 字号, 分辨率)只渲染一次。"""
+    try:
+        _configure_matplotlib()
+        from matplotlib import mathtext
+        from matplotlib.font_manager import FontProperties
+        
+        # 直接用mathtext渲染，跳过pyplot的Figure/Axes管理开销
+        buf = BytesIO()
+        mathtext.math_to_image(
+            f'${latex_text}$', buf,
+            prop=FontProperties(size=fontsize),
+            dpi=dpi, format='png'
+        )
+        return buf.getvalue()
+        
+    except Exception as e:
+        print(f"LaTeX渲染失败: {e}")
+        return None
+
+
+def _char_translation(symbols: Dict[str, str], excluded: FrozenSet[str]) -> Dict[int, str]:
+    """构建单字符符号的translate表，跳过需要按位置处理的符号。"""
+    return str.maketrans({sym: latex for sym, latex in symbols.items() if sym not in excluded})
 
 
 class LaTeXMathProcessor:
     """Processes LaTeX mathematical formulas and converts them to images."""
     
-    def __init__(self):
-        # 设置matplotlib支持中文和数学公式
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS']
-        plt.rcParams['axes.unicode_minus'] = False
-        
-        # 数学符号到LaTeX的映射
-        self.symbol_to_latex = {
-            '÷': r'\div',
-            '×': r'\times',
-            '±': r'\pm',
-            '≤': r'\leq',
-            '≥': r'\geq',
-            '≠': r'\neq',
-            '≈': r'\approx',
-            '∞': r'\infty',
-            'π': r'\pi',
-            '°': r'^\circ',
-            '√': r'\sqrt',
-            '²': r'^2',
-            '³': r'^3',
-            '∠': r'\angle',
-            '⊥': r'\perp',
-            '∥': r'\parallel',
-            'α': r'\alpha',
-            'β': r'\beta',
-            'γ': r'\gamma',
-            'δ': r'\delta',
-            'θ': r'\theta',
-            'λ': r'\lambda',
-            'μ': r'\mu',
-            'σ': r'\sigma',
-            'Δ': r'\Delta',
-            'Σ': r'\Sigma',
-        }
+    # 数学符号到LaTeX的映射（所有实例共享）
+    SYMBOL_TO_LATEX: ClassVar[Dict[str, str]] = {
+        '÷': r'\div',
+        '×': r'\times',
+        '±': r'\pm',
+        '≤': r'\leq',
+        '≥': r'\geq',
+        '≠': r'\neq',
+        '≈': r'\approx',
+        '∞': r'\infty',
+        'π': r'\pi',
+        '°': r'^\circ',
+        '√': r'\sqrt',
+        '²': r'^2',
+        '³': r'^3',
+        '∠': r'\angle',
+        '⊥': r'\perp',
+        '∥': r'\parallel',
+        'α': r'\alpha',
+        'β': r'\beta',
+        'γ': r'\gamma',
+        'δ': r'\delta',
+        'θ': r'\theta',
+        'λ': r'\lambda',
+        'μ': r'\mu',
+        'σ': r'\sigma',
+        'Δ': r'\Delta',
+        'Σ': r'\Sigma',
+    }
+    
+    _SYMBOL_SET: ClassVar[FrozenSet[str]] = frozenset(SYMBOL_TO_LATEX)
+    
+    _POSITIONAL_SYMBOLS: ClassVar[FrozenSet[str]] = frozenset('√²³°')
+    
+    # 普通符号与位置无关，一次str.translate完成替换（根号、上标和度数需要位置相关的规则）
+    _CHAR_TRANSLATION: ClassVar[Dict[int, str]] = _char_translation(SYMBOL_TO_LATEX, _POSITIONAL_SYMBOLS)
+    
+    # 预编译的转换规则
+    _deg_re = re.compile(r'(\d+)°')
+    _sqrt_num_re = re.compile(r'√(\d+)')
+    _sup2_re = re.compile(r'([a-zA-Z0-9]+)²')
+    _sup3_re = re.compile(r'([a-zA-Z0-9]+)³')
+    _frac_re = re.compile(r'(\d+)\s*/\s*(\d+)')
+    _sup_re = re.compile(r'([a-zA-Z0-9])\^([a-zA-Z0-9])')
+    
+    # 可渲染的数学表达式：基本运算等式、根号等式、幂次运算
+    _math_expr_re = re.compile(
+        r'\d+\s*[÷×]\s*\d+\s*=\s*\d+'
+        r'|√\d+\s*=\s*\d+'
+        r'|\d+[²³]\s*[+\-]\s*\d+[²³]\s*=\s*\d+'
+    )
+    
+    # 数学模式：基本运算、幂次、根号、角度、方程/不等式
+    _math_pattern_re = re.compile(
+        r'\d+\s*[÷×]\s*\d+|\d+\^[23]|√\d+|\d+°|[a-zA-Z]\s*[=<>≤≥≠]\s*\d+'
+    )
+    
+    # 上面的每个数学模式都以数字为锚点，用于在正则扫描前快速排除纯文本
+    _digit_re = re.compile(r'\d')
     
     def detect_math_expressions(self, text: str) -> bool:
         """
@@ -61,24 +118,15 @@ class LaTeXMathProcessor:
             是否包含数学表达式
         """
         # 检查是否包含数学符号
-        for symbol in self.symbol_to_latex.keys():
-            if symbol in text:
-                return True
+        if not self._SYMBOL_SET.isdisjoint(text):
+            return True
+        
+        # 不含数字的纯文本不可能匹配任何数学模式，跳过完整的模式扫描
+        if self._digit_re.search(text) is None:
+            return False
         
         # 检查是否包含数学模式的模式
-        math_patterns = [
-            r'\d+\s*[÷×]\s*\d+',  # 基本运算
-            r'\d+\^[23]',          # 幂次
-            r'√\d+',               # 根号
-            r'\d+°',               # 角度
-            r'[a-zA-Z]\s*[=<>≤≥≠]\s*\d+',  # 方程/不等式
-        ]
-        
-        for pattern in math_patterns:
-            if re.search(pattern, text):
-                return True
-        
-        return False
+        return self._math_pattern_re.search(text) is not None
     
     def convert_to_latex(self, text: str) -> str:
         """
@@ -90,30 +138,25 @@ class LaTeXMathProcessor:
         Returns:
             LaTeX格式的文本
         """
-        result = text
-        
         # 替换数学符号
-        for symbol, latex in self.symbol_to_latex.items():
-            if symbol in result:
-                if symbol == '√':
-                    # 特殊处理根号
-                    result = re.sub(r'√(\d+)', r'\\sqrt{\1}', result)
-                    result = result.replace('√', '\\sqrt{}')
-                elif symbol in ['²', '³']:
-                    # 处理上标
-                    escaped_symbol = re.escape(symbol)
-                    result = re.sub(f'([a-zA-Z0-9]+){escaped_symbol}', f'\\1{latex}', result)
-                elif symbol == '°':
-                    # 处理度数符号 - 修复转义问题
-                    result = re.sub(r'(\d+)°', r'\1^\\circ', result)
-                else:
-                    result = result.replace(symbol, latex)
+        result = text.translate(self._CHAR_TRANSLATION)
+        
+        # 处理度数符号
+        result = self._deg_re.sub(r'\1^\\circ', result)
+        
+        # 特殊处理根号
+        result = self._sqrt_num_re.sub(r'\\sqrt{\1}', result)
+        result = result.replace('√', '\\sqrt{}')
+        
+        # 处理上标
+        result = self._sup2_re.sub(r'\1^2', result)
+        result = self._sup3_re.sub(r'\1^3', result)
         
         # 处理分数形式 a/b -> \frac{a}{b}
-        result = re.sub(r'(\d+)\s*/\s*(\d+)', r'\\frac{\1}{\2}', result)
+        result = self._frac_re.sub(r'\\frac{\1}{\2}', result)
         
         # 处理简单的上标 a^b
-        result = re.sub(r'([a-zA-Z0-9])\^([a-zA-Z0-9])', r'\1^{\2}', result)
+        result = self._sup_re.sub(r'\1^{\2}', result)
         
         return result
     
@@ -127,32 +170,9 @@ class LaTeXMathProcessor:
             dpi: 图像分辨率
             
         Returns:
-            图像的字节数据，如果渲染失败则返回None
+            PNG图像的字节数据，如果渲染失败则返回None
         """
-        try:
-            # 创建图形
-            fig, ax = plt.subplots(figsize=(8, 2))
-            ax.axis('off')
-            
-            # 渲染LaTeX公式
-            ax.text(0.5, 0.5, f'${latex_text}$', 
-                   transform=ax.transAxes,
-                   fontsize=fontsize,
-                   ha='center', va='center',
-                   bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8))
-            
-            # 保存为字节流
-            buf = BytesIO()
-            plt.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', 
-                       facecolor='white', edgecolor='none')
-            plt.close(fig)
-            
-            buf.seek(0)
-            return buf.getvalue()
-            
-        except Exception as e:
-            print(f"LaTeX渲染失败: {e}")
-            return None
+        return _render_cached(latex_text, fontsize, dpi)
     
     def process_text_with_math(self, text: str) -> Tuple[str, list]:
         """
@@ -164,40 +184,44 @@ class LaTeXMathProcessor:
         Returns:
             (处理后的文本, 数学图像列表)
         """
-        if not self.detect_math_expressions(text):
+        # 只扫描一次：没有可渲染的表达式时直接返回原文
+        matches = self._math_expr_re.finditer(text)
+        first = next(matches, None)
+        if first is None:
             return text, []
         
-        # 找到数学表达式
         math_expressions = []
-        processed_text = text
-        
-        # 简单的数学表达式模式
-        patterns = [
-            r'\d+\s*[÷×]\s*\d+\s*=\s*\d+',  # 基本运算等式
-            r'√\d+\s*=\s*\d+',               # 根号等式
-            r'\d+[²³]\s*[+\-]\s*\d+[²³]\s*=\s*\d+',  # 幂次运算
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                math_expr = match.group()
-                latex_expr = self.convert_to_latex(math_expr)
-                
-                # 渲染为图像
-                img_data = self.render_math_to_image(latex_expr)
-                if img_data:
-                    placeholder = f"[MATH_IMG_{len(math_expressions)}]"
-                    processed_text = processed_text.replace(math_expr, placeholder, 1)
-                    math_expressions.append({
-                        'placeholder': placeholder,
-                        'original': math_expr,
-                        'latex': latex_expr,
-                        'image_data': img_data
-                    })
-        
-        return processed_text, math_expressions
+        parts = []
+        last_end = 0
+        for match in itertools.chain((first,), matches):
+            parts.append(text[last_end:match.start()])
+            parts.append(self._emit_math_image(match, math_expressions))
+            last_end = match.end()
+        parts.append(text[last_end:])
+        
+        return ''.join(parts), math_expressions
+    
+    def _emit_math_image(self, match: re.Match, math_expressions: list) -> str:
+        """渲染匹配到的表达式，成功时记录图像并返回占位符，否则保留原文。"""
+        math_expr = match.group()
+        latex_expr = self.convert_to_latex(math_expr)
+        
+        # 渲染为图像
+        img_data = self.render_math_to_image(latex_expr)
+        if not img_data:
+            return math_expr
+        
+        placeholder = f"[MATH_IMG_{len(math_expressions)}]"
+        math_expressions.append({
+            'placeholder': placeholder,
+            'original': math_expr,
+            'latex': latex_expr,
+            'image_data': img_data
+        })
+        return placeholder
 
 
-# 全局实例
-latex_processor = LaTeXMathProcessor()
\ No newline at end of file
+@cache
+def get_latex_processor() -> LaTeXMathProcessor:
+    """Return the shared processor; matplotlib is only imported once a formula is rendered."""
+    return LaTeXMathProcessor()
@@ -1,19 +1,181 @@
 """PDF generation utilities for study notes."""
 
+import copy
 import os
-from typing import List, Dict, Any
+import itertools
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import inch, cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Flowable
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
 from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from datetime import datetime
 
 # 使用与试卷生成器相同的字体注册函数和数学符号处理
-from agent.pdf_generator import register_chinese_fonts, replace_math_symbols
+from agent.pdf_generator import ensure_output_dir, register_chinese_fonts, replace_math_symbols, resolve_safe_font
+
+
+class _IconTable(dict):
+    """Icon lookup that falls back to a default icon for unknown labels.
+    
+    Unlike ``defaultdict``, a miss does not insert the key, so arbitrary
+    labels from LLM output never grow the shared table.
+    """
+    
+    def __init__(self, default: str, icons: Dict[str, str]):
+        super().__init__(icons)
+        self.default = default
+    
+    def __missing__(self, key: Any) -> str:
+        return self.default
+
+
+# 各类标签对应的图标（缺省值与未知标签的图标一致）
+_IMPORTANCE_ICONS = _IconTable("🔵", {"基础": "🔵", "重要": "🟡", "核心": "🔴"})
+_CATEGORY_ICONS = _IconTable("📚", {"记忆": "🧠", "理解": "💡", "应用": "⚡", "解题": "🎯", "通用": "📚"})
+_DIFFICULTY_ICONS = _IconTable("⭐⭐", {"简单": "⭐", "中等": "⭐⭐", "困难": "⭐⭐⭐"})
+_LEVEL_ICONS = _IconTable("⭐", {"基础": "⭐", "提高": "⭐⭐", "综合": "⭐⭐⭐", "创新": "🌟"})
+_RESOURCE_ICONS = _IconTable("📎", {"书籍": "📖", "网站": "🌐", "视频": "🎥", "工具": "🔧"})
+
+_DEFAULT_CATEGORY = "通用"
+_DEFAULT_LEVEL = "基础"
+
+# 固定前缀，与已替换过符号的文本直接拼接
+_BULLET = "• "
+_SCENARIOS_PREFIX = "🎯 适用场景："
+_EFFECTIVENESS_PREFIX = "✅ 效果说明："
+_CONNECTION_PREFIX = "🔗 关联："
+_HISTORY_PREFIX = "📚 历史背景："
+_TIME_PREFIX = "⏰ 时间建议："
+_REASON_PREFIX = "💡 推荐理由："
+
+
+# 所有笔记文档共用的页面配置
+_DOC_TEMPLATE_KWARGS = MappingProxyType({
+    'pagesize': A4,
+    'rightMargin': 2*cm,
+    'leftMargin': 2*cm,
+    'topMargin': 2*cm,
+    'bottomMargin': 2*cm
+})
+
+
+def _tip_category(tip: Dict[str, Any]) -> str:
+    return tip.get('category', _DEFAULT_CATEGORY)
+
+
+def _sanitize_notes(value: Any) -> Any:
+    """递归替换笔记数据中所有字符串的数学符号，返回新的数据结构。"""
+    if isinstance(value, str):
+        return replace_math_symbols(value)
+    if isinstance(value, dict):
+        return {key: _sanitize_notes(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_sanitize_notes(item) for item in value]
+    return value
+
+
+@lru_cache(maxsize=None)
+def _get_or_build_styles(safe_font: str) -> StyleSheet1:
+    """Build the study notes stylesheet once per font and share it across generators."""
+    styles = getSampleStyleSheet()
+    
+    # 笔记标题样式
+    styles.add(ParagraphStyle(
+        name='NotesTitle',
+        parent=styles['Title'],
+        fontName=safe_font,
+        fontSize=18,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue,
+        leading=22
+    ))
+    
+    # 章节标题样式
+    styles.add(ParagraphStyle(
+        name='SectionTitle',
+        parent=styles['Heading1'],
+        fontName=safe_font,
+        fontSize=14,
+        spaceAfter=12,
+        spaceBefore=16,
+        textColor=colors.darkgreen,
+        leading=18
+    ))
+    
+    # 子标题样式
+    styles.add(ParagraphStyle(
+        name='SubTitle',
+        parent=styles['Heading2'],
+        fontName=safe_font,
+        fontSize=12,
+        spaceAfter=8,
+        spaceBefore=10,
+        textColor=colors.darkred,
+        leading=16
+    ))
+    
+    # 正文样式
+    styles.add(ParagraphStyle(
+        name='NotesBody',
+        parent=styles['Normal'],
+        fontName=safe_font,
+        fontSize=10,
+        spaceAfter=6,
+        alignment=TA_JUSTIFY,
+        leading=14,
+        leftIndent=0.2*inch
+    ))
+    
+    # 重点内容样式
+    styles.add(ParagraphStyle(
+        name='Important',
+        parent=styles['Normal'],
+        fontName=safe_font,
+        fontSize=10,
+        spaceAfter=8,
+        spaceBefore=4,
+        leftIndent=0.3*inch,
+        rightIndent=0.3*inch,
+        borderColor=colors.orange,
+        borderWidth=1,
+        borderPadding=6,
+        backColor=colors.lightyellow,
+        leading=14
+    ))
+    
+    # 例子样式
+    styles.add(ParagraphStyle(
+        name='Example',
+        parent=styles['Normal'],
+        fontName=safe_font,
+        fontSize=9,
+        spaceAfter=6,
+        leftIndent=0.4*inch,
+        textColor=colors.darkblue,
+        leading=12,
+        backColor=colors.lightblue,
+        borderPadding=4
+    ))
+    
+    # 技巧样式
+    styles.add(ParagraphStyle(
+        name='Tip',
+        parent=styles['Normal'],
+        fontName=safe_font,
+        fontSize=10,
+        spaceAfter=6,
+        leftIndent=0.3*inch,
+        textColor=colors.darkgreen,
+        leading=13
+    ))
+    
+    return styles
 
 
 class StudyNotesPDFGenerator:
@@ -21,119 +183,26 @@ class StudyNotesPDFGenerator:
     
     def __init__(self):
         self.chinese_font = register_chinese_fonts()
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
+        self.styles = _get_or_build_styles(self._get_safe_font())
+        # 循环中反复出现的固定小标题只解析一次，使用时浅拷贝
+        self._label_cache: Dict[str, Paragraph] = {}
         print(f"Notes generator using font: {self.chinese_font}")
     
     def _get_safe_font(self):
         """获取安全的字体名称，确保中文显示"""
-        if self.chinese_font in ['STSong-Light', 'STHeiti']:
-            return self.chinese_font
-        
-        try:
-            from reportlab.pdfbase import pdfmetrics
-            font_names = pdfmetrics.getRegisteredFontNames()
-            if self.chinese_font in font_names:
-                return self.chinese_font
-        except:
-            pass
-        
-        return 'Helvetica'
+        return resolve_safe_font(self.chinese_font)
     
-    def _setup_custom_styles(self):
-        """Setup custom styles for study notes PDF."""
-        safe_font = self._get_safe_font()
+    def _label(self, text: str) -> Paragraph:
+        """Return a fresh copy of the cached Paragraph for a fixed in-section label.
         
-        # 笔记标题样式
-        self.styles.add(ParagraphStyle(
-            name='NotesTitle',
-            parent=self.styles['Title'],
-            fontName=safe_font,
-            fontSize=18,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue,
-            leading=22
-        ))
-        
-        # 章节标题样式
-        self.styles.add(ParagraphStyle(
-            name='SectionTitle',
-            parent=self.styles['Heading1'],
-            fontName=safe_font,
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=16,
-            textColor=colors.darkgreen,
-            leading=18
-        ))
-        
-        # 子标题样式
-        self.styles.add(ParagraphStyle(
-            name='SubTitle',
-            parent=self.styles['Heading2'],
-            fontName=safe_font,
-            fontSize=12,
-            spaceAfter=8,
-            spaceBefore=10,
-            textColor=colors.darkred,
-            leading=16
-        ))
-        
-        # 正文样式
-        self.styles.add(ParagraphStyle(
-            name='NotesBody',
-            parent=self.styles['Normal'],
-            fontName=safe_font,
-            fontSize=10,
-            spaceAfter=6,
-            alignment=TA_JUSTIFY,
-            leading=14,
-            leftIndent=0.2*inch
-        ))
-        
-        # 重点内容样式
-        self.styles.add(ParagraphStyle(
-            name='Important',
-            parent=self.styles['Normal'],
-            fontName=safe_font,
-            fontSize=10,
-            spaceAfter=8,
-            spaceBefore=4,
-            leftIndent=0.3*inch,
-            rightIndent=0.3*inch,
-            borderColor=colors.orange,
-            borderWidth=1,
-            borderPadding=6,
-            backColor=colors.lightyellow,
-            leading=14
-        ))
-        
-        # 例子样式
-        self.styles.add(ParagraphStyle(
-            name='Example',
-            parent=self.styles['Normal'],
-            fontName=safe_font,
-            fontSize=9,
-            spaceAfter=6,
-            leftIndent=0.4*inch,
-            textColor=colors.darkblue,
-            leading=12,
-            backColor=colors.lightblue,
-            borderPadding=4
-        ))
-        
-        # 技巧样式
-        self.styles.add(ParagraphStyle(
-            name='Tip',
-            parent=self.styles['Normal'],
-            fontName=safe_font,
-            fontSize=10,
-            spaceAfter=6,
-            leftIndent=0.3*inch,
-            textColor=colors.darkgreen,
-            leading=13
-        ))
+        The markup is parsed once per label; each use gets a shallow copy
+        because reportlab records layout state (e.g. ``_postponed``) on the
+        flowable itself, so one instance cannot appear twice in a story.
+        """
+        label = self._label_cache.get(text)
+        if label is None:
+            label = self._label_cache[text] = Paragraph(text, self.styles['Tip'])
+        return copy.copy(label)
     
     def generate_study_notes_pdf(
         self,
@@ -156,289 +225,307 @@ class StudyNotesPDFGenerator:
         Returns:
             Path to the generated PDF file
         """
+        date_str = datetime.now().strftime("%Y年%m月%d日")
+        
         # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        ensure_output_dir(output_path)
+        
+        # 一次遍历完成所有文本的数学符号替换
+        notes_data = _sanitize_notes(notes_data)
         
         # Create PDF document
-        doc = SimpleDocTemplate(
-            output_path,
-            pagesize=A4,
-            rightMargin=2*cm,
-            leftMargin=2*cm,
-            topMargin=2*cm,
-            bottomMargin=2*cm
-        )
+        doc = SimpleDocTemplate(output_path, **_DOC_TEMPLATE_KWARGS)
         
-        # Build content
-        story = []
+        # Build content section by section; each section has its own generator
+        # method, chained into the single list that doc.build() consumes
+        story = list(itertools.chain(
+            self._iter_header(topic, subject, education_level, date_str),
+            self._iter_topic_overview(notes_data),
+            self._iter_learning_objectives(notes_data),
+            self._iter_knowledge_points(notes_data),
+            self._iter_study_tips(notes_data),
+            self._iter_extended_knowledge(notes_data),
+            self._iter_knowledge_structure(notes_data),
+            self._iter_summary(notes_data),
+            self._iter_practice_recommendations(notes_data),
+            self._iter_learning_resources(notes_data),
+            self._iter_faqs(notes_data),
+            self._iter_self_assessment(notes_data)
+        ))
         
+        # Build PDF
+        doc.build(story)
+        return output_path
+    
+    def _iter_header(self, topic: str, subject: str, education_level: str, date_str: str) -> Iterator[Flowable]:
+        """Yield the title and metadata line."""
         # Add title
         title = f"{topic} - 学习笔记"
-        story.append(Paragraph(title, self.styles['NotesTitle']))
+        yield Paragraph(title, self.styles['NotesTitle'])
         
         # Add metadata
-        date_str = datetime.now().strftime("%Y年%m月%d日")
         metadata = f"学科：{subject} | 学段：{education_level} | 生成日期：{date_str}"
-        story.append(Paragraph(metadata, self.styles['NotesBody']))
-        story.append(Spacer(1, 0.3*cm))
+        yield Paragraph(metadata, self.styles['NotesBody'])
+        yield Spacer(1, 0.3*cm)
+    
+    def _iter_topic_overview(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the topic overview section."""
+        if not notes_data.get('topic_overview'):
+            return
+        
+        yield Paragraph("📖 主题概述", self.styles['SectionTitle'])
+        yield Paragraph(notes_data['topic_overview'], self.styles['NotesBody'])
+        yield Spacer(1, 0.2*cm)
+    
+    def _iter_learning_objectives(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the learning objectives section."""
+        if not notes_data.get('learning_objectives'):
+            return
         
-        # Add topic overview
-        if notes_data.get('topic_overview'):
-            story.append(Paragraph("📖 主题概述", self.styles['SectionTitle']))
-            safe_overview = replace_math_symbols(notes_data['topic_overview'])
-            story.append(Paragraph(safe_overview, self.styles['NotesBody']))
-            story.append(Spacer(1, 0.2*cm))
+        yield Paragraph("🎯 学习目标", self.styles['SectionTitle'])
+        for i, objective in enumerate(notes_data['learning_objectives'], 1):
+            yield Paragraph(f"{i}. {objective}", self.styles['NotesBody'])
+        yield Spacer(1, 0.2*cm)
+    
+    def _iter_knowledge_points(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the knowledge points section."""
+        if not notes_data.get('knowledge_points'):
+            return
         
-        # Add learning objectives
-        if notes_data.get('learning_objectives'):
-            story.append(Paragraph("🎯 学习目标", self.styles['SectionTitle']))
-            for i, objective in enumerate(notes_data['learning_objectives'], 1):
-                safe_objective = replace_math_symbols(objective)
-                story.append(Paragraph(f"{i}. {safe_objective}", self.styles['NotesBody']))
-            story.append(Spacer(1, 0.2*cm))
+        yield Paragraph("🎯 核心知识点", self.styles['SectionTitle'])
         
-        # Add knowledge points
-        if notes_data.get('knowledge_points'):
-            story.append(Paragraph("🎯 核心知识点", self.styles['SectionTitle']))
+        for i, kp in enumerate(notes_data['knowledge_points'], 1):
+            # Knowledge point title with importance
+            importance_icon = _IMPORTANCE_ICONS[kp.get('importance')]
+            kp_title = f"{i}. {importance_icon} {kp.get('title', '')}"
+            yield Paragraph(kp_title, self.styles['SubTitle'])
+            
+            # Definition
+            if kp.get('definition'):
+                yield self._label("📝 定义：")
+                yield Paragraph(kp['definition'], self.styles['Important'])
+            
+            # Knowledge point content
+            if kp.get('content'):
+                yield Paragraph(kp['content'], self.styles['NotesBody'])
             
-            for i, kp in enumerate(notes_data['knowledge_points'], 1):
-                # Knowledge point title with importance
-                importance_icon = {"基础": "🔵", "重要": "🟡", "核心": "🔴"}.get(kp.get('importance', '基础'), "🔵")
-                safe_title = replace_math_symbols(kp.get('title', ''))
-                kp_title = f"{i}. {importance_icon} {safe_title}"
-                story.append(Paragraph(kp_title, self.styles['SubTitle']))
+            # Key points
+            if kp.get('key_points'):
+                yield self._label("🔑 关键要点：")
+                for key_point in kp['key_points']:
+                    yield Paragraph(_BULLET + key_point, self.styles['NotesBody'])
+            
+            # Examples
+            if kp.get('examples'):
+                yield self._label("💡 例子：")
+                for example in kp['examples']:
+                    yield Paragraph(_BULLET + example, self.styles['Example'])
+            
+            # Common mistakes
+            if kp.get('common_mistakes'):
+                yield self._label("⚠️ 常见误区：")
+                for mistake in kp['common_mistakes']:
+                    yield Paragraph(_BULLET + mistake, self.styles['Example'])
+            
+            # Connections
+            if kp.get('connections'):
+                yield self._label("🔗 知识关联：")
+                for connection in kp['connections']:
+                    yield Paragraph(_BULLET + connection, self.styles['NotesBody'])
+            
+            yield Spacer(1, 0.2*cm)
+    
+    def _iter_study_tips(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the study tips section."""
+        if not notes_data.get('study_tips'):
+            return
+        
+        yield Paragraph("🚀 学习技巧", self.styles['SectionTitle'])
+        
+        # Group tips by category; categories keep their first-seen order
+        # because sorted() is stable and ranks by first appearance
+        all_tips = notes_data['study_tips']
+        category_rank = {
+            category: rank
+            for rank, category in enumerate(dict.fromkeys(map(_tip_category, all_tips)))
+        }
+        sorted_tips = sorted(all_tips, key=lambda tip: category_rank[_tip_category(tip)])
+        
+        for category, tips in itertools.groupby(sorted_tips, key=_tip_category):
+            icon = _CATEGORY_ICONS[category]
+            yield Paragraph(f"{icon} {category}技巧", self.styles['SubTitle'])
+            
+            for tip in tips:
+                tip_title = _BULLET + tip.get('title', '')
+                yield Paragraph(tip_title, self.styles['Tip'])
                 
-                # Definition
-                if kp.get('definition'):
-                    story.append(Paragraph("📝 定义：", self.styles['Tip']))
-                    safe_definition = replace_math_symbols(kp['definition'])
-                    story.append(Paragraph(safe_definition, self.styles['Important']))
+                if tip.get('content'):
+                    yield Paragraph(tip['content'], self.styles['NotesBody'])
                 
-                # Knowledge point content
-                if kp.get('content'):
-                    safe_content = replace_math_symbols(kp['content'])
-                    story.append(Paragraph(safe_content, self.styles['NotesBody']))
+                # Steps
+                if tip.get('steps'):
+                    yield self._label("📋 操作步骤：")
+                    for j, step in enumerate(tip['steps'], 1):
+                        yield Paragraph(f"{j}. {step}", self.styles['NotesBody'])
                 
-                # Key points
-                if kp.get('key_points'):
-                    story.append(Paragraph("🔑 关键要点：", self.styles['Tip']))
-                    for key_point in kp['key_points']:
-                        safe_key_point = replace_math_symbols(key_point)
-                        story.append(Paragraph(f"• {safe_key_point}", self.styles['NotesBody']))
+                # Applicable scenarios
+                if tip.get('applicable_scenarios'):
+                    scenarios_text = _SCENARIOS_PREFIX + "、".join(tip['applicable_scenarios'])
+                    yield Paragraph(scenarios_text, self.styles['Example'])
                 
                 # Examples
-                if kp.get('examples'):
-                    story.append(Paragraph("💡 例子：", self.styles['Tip']))
-                    for example in kp['examples']:
-                        safe_example = replace_math_symbols(example)
-                        story.append(Paragraph(f"• {safe_example}", self.styles['Example']))
-                
-                # Common mistakes
-                if kp.get('common_mistakes'):
-                    story.append(Paragraph("⚠️ 常见误区：", self.styles['Tip']))
-                    for mistake in kp['common_mistakes']:
-                        safe_mistake = replace_math_symbols(mistake)
-                        story.append(Paragraph(f"• {safe_mistake}", self.styles['Example']))
-                
-                # Connections
-                if kp.get('connections'):
-                    story.append(Paragraph("🔗 知识关联：", self.styles['Tip']))
-                    for connection in kp['connections']:
-                        safe_connection = replace_math_symbols(connection)
-                        story.append(Paragraph(f"• {safe_connection}", self.styles['NotesBody']))
+                if tip.get('examples'):
+                    yield self._label("💡 使用实例：")
+                    for example in tip['examples']:
+                        yield Paragraph(_BULLET + example, self.styles['Example'])
                 
-                story.append(Spacer(1, 0.2*cm))
+                # Effectiveness
+                if tip.get('effectiveness'):
+                    effectiveness_text = _EFFECTIVENESS_PREFIX + tip['effectiveness']
+                    yield Paragraph(effectiveness_text, self.styles['Example'])
+            
+            yield Spacer(1, 0.15*cm)
+    
+    def _iter_extended_knowledge(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the extended knowledge section."""
+        if not notes_data.get('extended_knowledge'):
+            return
+        
+        yield Paragraph("🌟 扩展知识", self.styles['SectionTitle'])
         
-        # Add study tips
-        if notes_data.get('study_tips'):
-            story.append(Paragraph("🚀 学习技巧", self.styles['SectionTitle']))
+        for i, ek in enumerate(notes_data['extended_knowledge'], 1):
+            # Extended knowledge title with difficulty
+            difficulty_icon = _DIFFICULTY_ICONS[ek.get('difficulty_level')]
+            ek_title = f"{i}. {ek.get('title', '')} {difficulty_icon}"
+            yield Paragraph(ek_title, self.styles['SubTitle'])
             
-            # Group tips by category
-            tips_by_category = {}
-            for tip in notes_data['study_tips']:
-                category = tip.get('category', '通用')
-                if category not in tips_by_category:
-                    tips_by_category[category] = []
-                tips_by_category[category].append(tip)
+            # Content
+            if ek.get('content'):
+                yield Paragraph(ek['content'], self.styles['NotesBody'])
             
-            category_icons = {
-                "记忆": "🧠", "理解": "💡", "应用": "⚡", "解题": "🎯", "通用": "📚"
-            }
+            # Connection
+            if ek.get('connection'):
+                connection_text = _CONNECTION_PREFIX + ek['connection']
+                yield Paragraph(connection_text, self.styles['Tip'])
             
-            for category, tips in tips_by_category.items():
-                icon = category_icons.get(category, "📚")
-                story.append(Paragraph(f"{icon} {category}技巧", self.styles['SubTitle']))
-                
-                for tip in tips:
-                    safe_tip_title = replace_math_symbols(tip.get('title', ''))
-                    tip_title = f"• {safe_tip_title}"
-                    story.append(Paragraph(tip_title, self.styles['Tip']))
-                    
-                    if tip.get('content'):
-                        safe_tip_content = replace_math_symbols(tip['content'])
-                        story.append(Paragraph(safe_tip_content, self.styles['NotesBody']))
-                    
-                    # Steps
-                    if tip.get('steps'):
-                        story.append(Paragraph("📋 操作步骤：", self.styles['Tip']))
-                        for j, step in enumerate(tip['steps'], 1):
-                            safe_step = replace_math_symbols(step)
-                            story.append(Paragraph(f"{j}. {safe_step}", self.styles['NotesBody']))
-                    
-                    # Applicable scenarios
-                    if tip.get('applicable_scenarios'):
-                        scenarios_text = "🎯 适用场景：" + "、".join(tip['applicable_scenarios'])
-                        story.append(Paragraph(scenarios_text, self.styles['Example']))
-                    
-                    # Examples
-                    if tip.get('examples'):
-                        story.append(Paragraph("💡 使用实例：", self.styles['Tip']))
-                        for example in tip['examples']:
-                            safe_example = replace_math_symbols(example)
-                            story.append(Paragraph(f"• {safe_example}", self.styles['Example']))
-                    
-                    # Effectiveness
-                    if tip.get('effectiveness'):
-                        safe_effectiveness = replace_math_symbols(tip['effectiveness'])
-                        effectiveness_text = f"✅ 效果说明：{safe_effectiveness}"
-                        story.append(Paragraph(effectiveness_text, self.styles['Example']))
-                
-                story.append(Spacer(1, 0.15*cm))
-        
-        # Add extended knowledge
-        if notes_data.get('extended_knowledge'):
-            story.append(Paragraph("🌟 扩展知识", self.styles['SectionTitle']))
+            # Applications
+            if ek.get('applications'):
+                yield self._label("🌍 实际应用：")
+                for application in ek['applications']:
+                    yield Paragraph(_BULLET + application, self.styles['NotesBody'])
             
-            for i, ek in enumerate(notes_data['extended_knowledge'], 1):
-                # Extended knowledge title with difficulty
-                difficulty_icon = {"简单": "⭐", "中等": "⭐⭐", "困难": "⭐⭐⭐"}.get(ek.get('difficulty_level', '中等'), "⭐⭐")
-                safe_ek_title = replace_math_symbols(ek.get('title', ''))
-                ek_title = f"{i}. {safe_ek_title} {difficulty_icon}"
-                story.append(Paragraph(ek_title, self.styles['SubTitle']))
-                
-                # Content
-                if ek.get('content'):
-                    safe_ek_content = replace_math_symbols(ek['content'])
-                    story.append(Paragraph(safe_ek_content, self.styles['NotesBody']))
-                
-                # Connection
-                if ek.get('connection'):
-                    safe_connection = replace_math_symbols(ek['connection'])
-                    connection_text = f"🔗 关联：{safe_connection}"
-                    story.append(Paragraph(connection_text, self.styles['Tip']))
-                
-                # Applications
-                if ek.get('applications'):
-                    story.append(Paragraph("🌍 实际应用：", self.styles['Tip']))
-                    for application in ek['applications']:
-                        safe_application = replace_math_symbols(application)
-                        story.append(Paragraph(f"• {safe_application}", self.styles['NotesBody']))
-                
-                # Historical context
-                if ek.get('historical_context'):
-                    safe_historical = replace_math_symbols(ek['historical_context'])
-                    historical_text = f"📚 历史背景：{safe_historical}"
-                    story.append(Paragraph(historical_text, self.styles['Example']))
-                
-                # Cross-subject links
-                if ek.get('cross_subject_links'):
-                    story.append(Paragraph("🔄 跨学科联系：", self.styles['Tip']))
-                    for link in ek['cross_subject_links']:
-                        safe_link = replace_math_symbols(link)
-                        story.append(Paragraph(f"• {safe_link}", self.styles['NotesBody']))
-                
-                story.append(Spacer(1, 0.2*cm))
+            # Historical context
+            if ek.get('historical_context'):
+                historical_text = _HISTORY_PREFIX + ek['historical_context']
+                yield Paragraph(historical_text, self.styles['Example'])
+            
+            # Cross-subject links
+            if ek.get('cross_subject_links'):
+                yield self._label("🔄 跨学科联系：")
+                for link in ek['cross_subject_links']:
+                    yield Paragraph(_BULLET + link, self.styles['NotesBody'])
+            
+            yield Spacer(1, 0.2*cm)
+    
+    def _iter_knowledge_structure(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the knowledge structure section."""
+        if not notes_data.get('knowledge_structure'):
+            return
+        
+        yield Paragraph("🗺️ 知识结构", self.styles['SectionTitle'])
+        yield Paragraph(notes_data['knowledge_structure'], self.styles['Important'])
+        yield Spacer(1, 0.2*cm)
+    
+    def _iter_summary(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the summary section."""
+        if not notes_data.get('summary'):
+            return
         
-        # Add knowledge structure
-        if notes_data.get('knowledge_structure'):
-            story.append(Paragraph("🗺️ 知识结构", self.styles['SectionTitle']))
-            safe_structure = replace_math_symbols(notes_data['knowledge_structure'])
-            story.append(Paragraph(safe_structure, self.styles['Important']))
-            story.append(Spacer(1, 0.2*cm))
+        yield Paragraph("📝 系统总结", self.styles['SectionTitle'])
+        yield Paragraph(notes_data['summary'], self.styles['Important'])
+        yield Spacer(1, 0.2*cm)
+    
+    def _iter_practice_recommendations(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the practice recommendations section."""
+        if not notes_data.get('practice_recommendations'):
+            return
         
-        # Add summary
-        if notes_data.get('summary'):
-            story.append(Paragraph("📝 系统总结", self.styles['SectionTitle']))
-            safe_summary = replace_math_symbols(notes_data['summary'])
-            story.append(Paragraph(safe_summary, self.styles['Important']))
-            story.append(Spacer(1, 0.2*cm))
+        yield Paragraph("💪 分层练习推荐", self.styles['SectionTitle'])
         
-        # Add practice recommendations
-        if notes_data.get('practice_recommendations'):
-            story.append(Paragraph("💪 分层练习推荐", self.styles['SectionTitle']))
+        for practice in notes_data['practice_recommendations']:
+            level = practice.get('level', _DEFAULT_LEVEL)
+            practice_title = f"{_LEVEL_ICONS[level]} {level}练习：{practice.get('title', '')}"
+            yield Paragraph(practice_title, self.styles['SubTitle'])
             
-            level_icons = {"基础": "⭐", "提高": "⭐⭐", "综合": "⭐⭐⭐", "创新": "🌟"}
+            if practice.get('description'):
+                yield Paragraph(practice['description'], self.styles['NotesBody'])
             
-            for practice in notes_data['practice_recommendations']:
-                level_icon = level_icons.get(practice.get('level', '基础'), "⭐")
-                safe_title = replace_math_symbols(practice.get('title', ''))
-                practice_title = f"{level_icon} {practice.get('level', '基础')}练习：{safe_title}"
-                story.append(Paragraph(practice_title, self.styles['SubTitle']))
-                
-                if practice.get('description'):
-                    safe_description = replace_math_symbols(practice['description'])
-                    story.append(Paragraph(safe_description, self.styles['NotesBody']))
-                
-                if practice.get('methods'):
-                    story.append(Paragraph("📋 练习方法：", self.styles['Tip']))
-                    for method in practice['methods']:
-                        safe_method = replace_math_symbols(method)
-                        story.append(Paragraph(f"• {safe_method}", self.styles['NotesBody']))
-                
-                if practice.get('time_suggestion'):
-                    safe_time = replace_math_symbols(practice['time_suggestion'])
-                    time_text = f"⏰ 时间建议：{safe_time}"
-                    story.append(Paragraph(time_text, self.styles['Example']))
-                
-                story.append(Spacer(1, 0.15*cm))
-        
-        # Add learning resources
-        if notes_data.get('learning_resources'):
-            story.append(Paragraph("📚 学习资源推荐", self.styles['SectionTitle']))
+            if practice.get('methods'):
+                yield self._label("📋 练习方法：")
+                for method in practice['methods']:
+                    yield Paragraph(_BULLET + method, self.styles['NotesBody'])
             
-            resource_icons = {"书籍": "📖", "网站": "🌐", "视频": "🎥", "工具": "🔧"}
+            if practice.get('time_suggestion'):
+                time_text = _TIME_PREFIX + practice['time_suggestion']
+                yield Paragraph(time_text, self.styles['Example'])
             
-            for resource in notes_data['learning_resources']:
-                resource_icon = resource_icons.get(resource.get('type', '其他'), "📎")
-                safe_title = replace_math_symbols(resource.get('title', ''))
-                resource_title = f"{resource_icon} {safe_title}"
-                story.append(Paragraph(resource_title, self.styles['SubTitle']))
-                
-                if resource.get('description'):
-                    safe_description = replace_math_symbols(resource['description'])
-                    story.append(Paragraph(safe_description, self.styles['NotesBody']))
-                
-                if resource.get('recommendation_reason'):
-                    safe_reason = replace_math_symbols(resource['recommendation_reason'])
-                    reason_text = f"💡 推荐理由：{safe_reason}"
-                    story.append(Paragraph(reason_text, self.styles['Example']))
-                
-                story.append(Spacer(1, 0.1*cm))
+            yield Spacer(1, 0.15*cm)
+    
+    def _iter_learning_resources(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the learning resources section."""
+        if not notes_data.get('learning_resources'):
+            return
         
-        # Add FAQs
-        if notes_data.get('faqs'):
-            story.append(Paragraph("❓ 常见问题解答", self.styles['SectionTitle']))
+        yield Paragraph("📚 学习资源推荐", self.styles['SectionTitle'])
+        
+        for resource in notes_data['learning_resources']:
+            resource_icon = _RESOURCE_ICONS[resource.get('type')]
+            resource_title = f"{resource_icon} {resource.get('title', '')}"
+            yield Paragraph(resource_title, self.styles['SubTitle'])
             
-            for i, faq in enumerate(notes_data['faqs'], 1):
-                safe_question = replace_math_symbols(faq.get('question', ''))
-                question_text = f"Q{i}: {safe_question}"
-                story.append(Paragraph(question_text, self.styles['SubTitle']))
-                
-                if faq.get('answer'):
-                    safe_answer = replace_math_symbols(faq['answer'])
-                    answer_text = f"A{i}: {safe_answer}"
-                    story.append(Paragraph(answer_text, self.styles['NotesBody']))
-                
-                story.append(Spacer(1, 0.1*cm))
+            if resource.get('description'):
+                yield Paragraph(resource['description'], self.styles['NotesBody'])
+            
+            if resource.get('recommendation_reason'):
+                reason_text = _REASON_PREFIX + resource['recommendation_reason']
+                yield Paragraph(reason_text, self.styles['Example'])
+            
+            yield Spacer(1, 0.1*cm)
+    
+    def _iter_faqs(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the FAQs section."""
+        if not notes_data.get('faqs'):
+            return
         
-        # Add self-assessment
-        if notes_data.get('self_assessment'):
-            story.append(Paragraph("🎯 自我检测", self.styles['SectionTitle']))
-            for i, assessment in enumerate(notes_data['self_assessment'], 1):
-                safe_assessment = replace_math_symbols(assessment)
-                assessment_text = f"{i}. {safe_assessment}"
-                story.append(Paragraph(assessment_text, self.styles['NotesBody']))
+        yield Paragraph("❓ 常见问题解答", self.styles['SectionTitle'])
         
-        # Build PDF
-        doc.build(story)
-        return output_path
\ No newline at end of file
+        for i, faq in enumerate(notes_data['faqs'], 1):
+            question_text = f"Q{i}: {faq.get('question', '')}"
+            yield Paragraph(question_text, self.styles['SubTitle'])
+            
+            if faq.get('answer'):
+                answer_text = f"A{i}: {faq['answer']}"
+                yield Paragraph(answer_text, self.styles['NotesBody'])
+            
+            yield Spacer(1, 0.1*cm)
+    
+    def _iter_self_assessment(self, notes_data: Dict[str, Any]) -> Iterator[Flowable]:
+        """Yield the self-assessment section."""
+        if not notes_data.get('self_assessment'):
+            return
+        
+        yield Paragraph("🎯 自我检测", self.styles['SectionTitle'])
+        for i, assessment in enumerate(notes_data['self_assessment'], 1):
+            assessment_text = f"{i}. {assessment}"
+            yield Paragraph(assessment_text, self.styles['NotesBody'])
+
+
+@lru_cache(maxsize=None)
+def _get_process_generator() -> StudyNotesPDFGenerator:
+    """Return this process's generator; fonts and styles are set up once per worker."""
+    return StudyNotesPDFGenerator()
+
+
+def render_study_notes_pdf(**kwargs) -> str:
+    """Render a study notes PDF with this process's shared generator (process-pool worker)."""
+    return _get_process_generator().generate_study_notes_pdf(**kwargs)
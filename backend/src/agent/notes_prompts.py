@@ -1,5 +1,7 @@
 """Prompt templates for study notes generation."""
 
+from agent.exam_prompts import compile_template
+
 notes_generator_instructions = """你是一位资深的教育专家和学习指导老师，拥有丰富的教学经验，负责为学生创建详细、全面、实用的学习笔记。
 
 当前日期：{current_date}
@@ -90,4 +92,7 @@ notes_generator_instructions = """你是一位资深的教育专家和学习指
 - 注重培养学生的学习兴趣和思维能力
 - 提供多种学习路径和方法选择
 
-请确保生成的学习笔记内容丰富详实，每个知识点都有充分的展开，每个技巧都有具体的操作指导，整体篇幅要达到一份完整学习资料的标准。"""
\ No newline at end of file
+请确保生成的学习笔记内容丰富详实，每个知识点都有充分的展开，每个技巧都有具体的操作指导，整体篇幅要达到一份完整学习资料的标准。"""
+
+
+notes_generator_template = compile_template(notes_generator_instructions)
@@ -1,11 +1,13 @@
 """Schemas for knowledge notes generation."""
 
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class KnowledgePoint(BaseModel):
     """Schema for a single knowledge point."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     title: str = Field(description="知识点标题")
     definition: str = Field(description="核心定义和基本概念")
     content: str = Field(description="知识点详细内容和解释")
@@ -18,6 +20,8 @@ class KnowledgePoint(BaseModel):
 
 class StudyTip(BaseModel):
     """Schema for study tips and techniques."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     category: str = Field(description="技巧类别：记忆/理解/应用/解题")
     title: str = Field(description="技巧标题")
     content: str = Field(description="技巧详细内容和方法")
@@ -29,6 +33,8 @@ class StudyTip(BaseModel):
 
 class ExtendedKnowledge(BaseModel):
     """Schema for extended knowledge."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     title: str = Field(description="扩展知识标题")
     content: str = Field(description="扩展知识详细内容")
     connection: str = Field(description="与主题的关联和意义")
@@ -40,6 +46,8 @@ class ExtendedKnowledge(BaseModel):
 
 class LearningResource(BaseModel):
     """Schema for learning resources."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     type: str = Field(description="资源类型：书籍/网站/视频/工具")
     title: str = Field(description="资源标题")
     description: str = Field(description="资源描述")
@@ -48,6 +56,8 @@ class LearningResource(BaseModel):
 
 class FAQ(BaseModel):
     """Schema for frequently asked questions."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     question: str = Field(description="常见问题")
     answer: str = Field(description="详细解答")
     category: str = Field(description="问题类别")
@@ -55,6 +65,8 @@ class FAQ(BaseModel):
 
 class PracticeRecommendation(BaseModel):
     """Schema for practice recommendations."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     level: str = Field(description="练习层次：基础/提高/综合/创新")
     title: str = Field(description="练习标题")
     description: str = Field(description="练习描述")
@@ -64,6 +76,8 @@ class PracticeRecommendation(BaseModel):
 
 class StudyNotes(BaseModel):
     """Schema for complete study notes."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     topic_overview: str = Field(description="详细主题概述")
     learning_objectives: List[str] = Field(description="学习目标")
     knowledge_points: List[KnowledgePoint] = Field(description="核心知识点")
@@ -1,7 +1,10 @@
 """PDF generation utilities for exam creation."""
 
+import copy
+import importlib.util
 import os
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Set
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
@@ -13,20 +16,17 @@ from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import Image as RLImage
+from reportlab.lib.utils import ImageReader
 from datetime import datetime
 import platform
 import re
 from io import BytesIO
+from types import MappingProxyType
 
-# 导入LaTeX数学处理器
-try:
-    from agent.latex_math import latex_processor
-    LATEX_AVAILABLE = True
-except ImportError:
-    LATEX_AVAILABLE = False
-    print("Warning: LaTeX math processing not available. Install matplotlib and sympy for math formula support.")
+# LaTeX数学处理器（公式检测不依赖matplotlib，渲染时才导入）
+from agent.latex_math import get_latex_processor
 
-# 数学符号映射表（作为LaTeX的备选方案）
+# 数学符号映射表（作为LaTeX的备选方案，replace_math_symbols以此为准）
 MATH_SYMBOL_MAP = {
     '÷': '/',      # 除号替换为斜杠
     '×': '*',      # 乘号替换为星号
@@ -41,11 +41,72 @@ MATH_SYMBOL_MAP = {
     '∞': 'infinity', # 无穷大
     'π': 'pi',     # 圆周率
     '°': 'deg',    # 度数
-    '∠': 'angle',  # 角度
+    '∠': 'angle ', # 角度（后加空格）
     '⊥': 'perp',   # 垂直
     '∥': 'parallel', # 平行
 }
 
+# 一次扫描处理所有符号：√数字 优先匹配为 sqrt(数字)，其余按映射表替换
+_MATH_SYMBOL_RE = re.compile(
+    r'√(\d+)|' + '|'.join(
+        re.escape(symbol) for symbol, replacement in MATH_SYMBOL_MAP.items() if symbol != replacement
+    )
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# 生成试卷前统一替换数学符号的题目字段（选项单独处理）
+_NORMALIZED_FIELDS = ('correct_answer', 'explanation')
+
+# 选项开头重复的标号：依次尝试 A. / A) 、A. A. 、(A) 、A . 四种格式，各最多去掉一次
+_OPTION_LABEL_RE = re.compile(
+    r'^(?:[A-D][.)]\s*)?'
+    r'(?:[A-D][.)]\s*[A-D][.)]\s*)?'
+    r'(?:\([A-D]\)\s*)?'
+    r'(?:[A-D]\s*[.)]\s*)?'
+)
+
+
+# 本进程中已确认存在的输出目录
+_ensured_dirs: Set[str] = set()
+
+
+def ensure_output_dir(output_path: str) -> None:
+    """确保输出文件所在目录存在，同一目录每个进程只创建一次。"""
+    output_dir = os.path.dirname(output_path)
+    if output_dir and output_dir not in _ensured_dirs:
+        os.makedirs(output_dir, exist_ok=True)
+        _ensured_dirs.add(output_dir)
+
+
+@lru_cache(maxsize=None)
+def _latex_available() -> bool:
+    """检查公式渲染依赖是否已安装，只查找不导入，首次遇到公式时才调用。"""
+    if importlib.util.find_spec("matplotlib") is None:
+        print("Warning: LaTeX math processing not available. Install matplotlib and sympy for math formula support.")
+        return False
+    return True
+
+
+@lru_cache(maxsize=4096)
+def _has_math(text: str) -> bool:
+    """缓存的数学表达式检测，选项、答案等短文本在试卷中大量重复。"""
+    return get_latex_processor().detect_math_expressions(text)
+
+
+@lru_cache(maxsize=512)
+def _math_image_reader(image_data: bytes) -> ImageReader:
+    """每个公式图像只解码一次，题目和答案中重复出现的公式共享同一个ImageReader。"""
+    return ImageReader(BytesIO(image_data))
+
+
+class _MathImage(RLImage):
+    """直接使用已解码ImageReader的图片流对象，避免每次插入都重新解码PNG。"""
+
+    def __init__(self, reader: ImageReader, width=None, height=None):
+        self._img = reader
+        super().__init__(reader.fp, width=width, height=height)
+
+
 def process_math_content(text: str, story: list, style) -> None:
     """
     处理包含数学公式的内容，优先使用LaTeX渲染。
@@ -59,9 +120,9 @@ def process_math_content(text: str, story: list, style) -> None:
         return
     
     # 如果LaTeX可用且文本包含数学表达式，使用LaTeX渲染
-    if LATEX_AVAILABLE and latex_processor.detect_math_expressions(text):
+    if _has_math(text) and _latex_available():
         try:
-            processed_text, math_images = latex_processor.process_text_with_math(text)
+            processed_text, math_images = get_latex_processor().process_text_with_math(text)
             
             # 如果有数学图像，分段处理
             if math_images:
@@ -75,8 +136,8 @@ def process_math_content(text: str, story: list, style) -> None:
                         story.append(Paragraph(parts[0].strip(), style))
                     
                     # 添加数学图像
-                    img_buffer = BytesIO(math_img['image_data'])
-                    img = RLImage(img_buffer, width=100, height=30)  # 调整大小
+                    reader = _math_image_reader(math_img['image_data'])
+                    img = _MathImage(reader, width=100, height=30)  # 调整大小
                     story.append(img)
                     
                     # 更新当前文本为剩余部分
@@ -95,6 +156,14 @@ def process_math_content(text: str, story: list, style) -> None:
     story.append(Paragraph(safe_text, style))
 
 
+def _replace_symbol_match(match: re.Match) -> str:
+    sqrt_operand = match.group(1)
+    if sqrt_operand is not None:
+        return f'sqrt({sqrt_operand})'
+    return MATH_SYMBOL_MAP[match.group(0)]
+
+
+@lru_cache(maxsize=4096)
 def replace_math_symbols(text: str) -> str:
     """
     替换文本中的数学符号为字体支持的字符（备选方案）。
@@ -108,44 +177,27 @@ def replace_math_symbols(text: str) -> str:
     if not text:
         return text
     
-    result = text
-    
-    # 特殊处理需要保持空格的符号
-    special_replacements = [
-        ('÷', '/'),      # 除号
-        ('×', '*'),      # 乘号  
-        ('∠', 'angle '), # 角度符号后加空格
-    ]
-    
-    for symbol, replacement in special_replacements:
-        if symbol in result:
-            result = result.replace(symbol, replacement)
-    
-    # 处理根号的特殊情况
-    if '√' in result:
-        # 匹配 √数字 的模式
-        result = re.sub(r'√(\d+)', r'sqrt(\1)', result)
-        # 处理其他根号情况
-        result = result.replace('√', 'sqrt')
-    
-    # 处理其他符号
-    other_symbols = {
-        '²': '^2', '³': '^3', '±': '+/-', 
-        '≤': '<=', '≥': '>=', '≠': '!=', 
-        '∞': 'infinity', 'π': 'pi', '°': 'deg',
-        '⊥': 'perp', '∥': 'parallel'
-    }
-    
-    for symbol, replacement in other_symbols.items():
-        if symbol in result:
-            result = result.replace(symbol, replacement)
+    # 一次扫描替换所有符号（包括根号）
+    result = _MATH_SYMBOL_RE.sub(_replace_symbol_match, text)
     
     # 清理多余的空格
-    result = re.sub(r'\s+', ' ', result).strip()
-    
-    return result
+    return _WHITESPACE_RE.sub(' ', result).strip()
+
+
+def _existing_font_files(font_paths: List[str]) -> Set[str]:
+    """一次扫描候选字体所在的目录，返回其中存在的文件路径（按平台规范化大小写）。"""
+    existing = set()
+    for font_dir in dict.fromkeys(os.path.dirname(font_path) for font_path in font_paths):
+        try:
+            with os.scandir(font_dir) as entries:
+                existing.update(os.path.normcase(entry.path) for entry in entries)
+        except OSError:
+            continue
+    return existing
 
-# 注册中文字体
+
+# 注册中文字体（每个进程只需注册一次）
+@lru_cache(maxsize=None)
 def register_chinese_fonts():
     """注册中文字体以支持中文显示"""
     try:
@@ -194,8 +246,9 @@ def register_chinese_fonts():
             ]
         
         # 尝试注册字体
+        available_fonts = _existing_font_files([font_path for font_path, _ in font_candidates])
         for font_path, font_name in font_candidates:
-            if os.path.exists(font_path):
+            if os.path.normcase(font_path) in available_fonts:
                 try:
                     # 对于TTF文件
                     if font_path.endswith('.ttf'):
@@ -224,6 +277,26 @@ def register_chinese_fonts():
         return 'Helvetica'
 
 
+@lru_cache(maxsize=None)
+def resolve_safe_font(font_name: str) -> str:
+    """获取安全的字体名称，确保中文显示（结果按字体名缓存，各生成器共用）"""
+    # 如果是CID字体，直接返回
+    if font_name in ['STSong-Light', 'STHeiti']:
+        return font_name
+    
+    # 对于其他字体，检查是否已注册
+    try:
+        # 测试字体是否可用
+        font_names = pdfmetrics.getRegisteredFontNames()
+        if font_name in font_names:
+            return font_name
+    except:
+        pass
+    
+    # 回退到Helvetica
+    return 'Helvetica'
+
+
 class TwoColumnDocTemplate(BaseDocTemplate):
     """自定义双栏文档模板"""
     
@@ -266,110 +339,86 @@ class TwoColumnDocTemplate(BaseDocTemplate):
         self.addPageTemplates([template])
 
 
+# 试卷文字样式：(样式名, 父样式名, 覆盖属性)，字体统一使用安全的中文字体
+_EXAM_STYLE_SPECS = (
+    # 试卷标题样式 - 极度紧凑
+    ('ExamTitle', 'Title', MappingProxyType({
+        'fontSize': 16,  # 进一步减小字体
+        'spaceAfter': 8,   # 大幅减少后间距
+        'alignment': TA_CENTER,
+        'textColor': colors.black,
+        'leading': 18,
+    })),
+    # 副标题样式 - 极度紧凑
+    ('SubTitle', 'Normal', MappingProxyType({
+        'fontSize': 10,
+        'spaceAfter': 5,   # 进一步减少间距
+        'alignment': TA_CENTER,
+        'textColor': colors.grey,
+        'leading': 12,
+    })),
+    # 考试信息样式 - 极度紧凑
+    ('ExamInfo', 'Normal', MappingProxyType({
+        'fontSize': 9,
+        'spaceAfter': 6,   # 进一步减少间距
+        'alignment': TA_LEFT,
+        'leading': 10,
+    })),
+    # 题目样式 - 适应双栏布局
+    ('Question', 'Normal', MappingProxyType({
+        'fontSize': 9,   # 双栏需要更小字体
+        'spaceAfter': 2,
+        'spaceBefore': 3,
+        'leftIndent': 0,
+        'leading': 11,
+        'textColor': colors.black,
+    })),
+    # 选项样式 - 适应双栏布局
+    ('Option', 'Normal', MappingProxyType({
+        'fontSize': 8,   # 双栏需要更小字体
+        'spaceAfter': 1,
+        'leftIndent': 0.15*inch,  # 减少缩进以适应窄栏
+        'leading': 9,
+    })),
+    # 答题区域样式 - 极度紧凑
+    ('AnswerSpace', 'Normal', MappingProxyType({
+        'fontSize': 8,
+        'spaceAfter': 1,   # 极小间距
+        'leftIndent': 0.2*inch,
+        'textColor': colors.grey,
+        'leading': 9,
+    })),
+)
+
+
 class ExamPDFGenerator:
     """Generates PDF documents for exams."""
     
     def __init__(self):
         self.chinese_font = register_chinese_fonts()
+        # 安全字体在构造时解析一次，样式和后续排版直接使用
+        self.safe_font = resolve_safe_font(self.chinese_font)
         self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
+        self._setup_custom_styles(self.safe_font)
+        # 答题横线内容固定，只解析一次；排版时会在流对象上记录状态，所以每次插入浅拷贝一份
+        self._answer_line = Paragraph("_" * 40, self.styles['AnswerSpace'])
         print(f"Using font: {self.chinese_font}")
     
     def _get_safe_font(self):
         """获取安全的字体名称，确保中文显示"""
-        # 如果是CID字体，直接返回
-        if self.chinese_font in ['STSong-Light', 'STHeiti']:
-            return self.chinese_font
-        
-        # 对于其他字体，检查是否已注册
-        try:
-            # 测试字体是否可用
-            from reportlab.pdfbase import pdfmetrics
-            font_names = pdfmetrics.getRegisteredFontNames()
-            if self.chinese_font in font_names:
-                return self.chinese_font
-        except:
-            pass
-        
-        # 回退到Helvetica
-        return 'Helvetica'
+        return self.safe_font
     
-    def _setup_custom_styles(self):
+    def _setup_custom_styles(self, safe_font: str):
         """Setup custom styles for the PDF with Chinese font support."""
-        safe_font = self._get_safe_font()
-        
-        # 试卷标题样式 - 极度紧凑
-        self.styles.add(ParagraphStyle(
-            name='ExamTitle',
-            parent=self.styles['Title'],
-            fontName=safe_font,
-            fontSize=16,  # 进一步减小字体
-            spaceAfter=8,   # 大幅减少后间距
-            alignment=TA_CENTER,
-            textColor=colors.black,
-            leading=18
-        ))
-        
-        # 副标题样式 - 极度紧凑
-        self.styles.add(ParagraphStyle(
-            name='SubTitle',
-            parent=self.styles['Normal'],
-            fontName=safe_font,
-            fontSize=10,
-            spaceAfter=5,   # 进一步减少间距
-            alignment=TA_CENTER,
-            textColor=colors.grey,
-            leading=12
-        ))
-        
-        # 考试信息样式 - 极度紧凑
-        self.styles.add(ParagraphStyle(
-            name='ExamInfo',
-            parent=self.styles['Normal'],
-            fontName=safe_font,
-            fontSize=9,
-            spaceAfter=6,   # 进一步减少间距
-            alignment=TA_LEFT,
-            leading=10
-        ))
-        
-        # 题目样式 - 适应双栏布局
-        self.styles.add(ParagraphStyle(
-            name='Question',
-            parent=self.styles['Normal'],
-            fontName=safe_font,
-            fontSize=9,   # 双栏需要更小字体
-            spaceAfter=2,
-            spaceBefore=3,
-            leftIndent=0,
-            leading=11,
-            textColor=colors.black
-        ))
-        
-        # 选项样式 - 适应双栏布局
-        self.styles.add(ParagraphStyle(
-            name='Option',
-            parent=self.styles['Normal'],
-            fontName=safe_font,
-            fontSize=8,   # 双栏需要更小字体
-            spaceAfter=1,
-            leftIndent=0.15*inch,  # 减少缩进以适应窄栏
-            leading=9
-        ))
-        
-        # 答题区域样式 - 极度紧凑
-        self.styles.add(ParagraphStyle(
-            name='AnswerSpace',
-            parent=self.styles['Normal'],
-            fontName=safe_font,
-            fontSize=8,
-            spaceAfter=1,   # 极小间距
-            leftIndent=0.2*inch,
-            textColor=colors.grey,
-            leading=9
-        ))
-        
-        # 分割线样式
+        for name, parent_name, overrides in _EXAM_STYLE_SPECS:
+            self.styles.add(ParagraphStyle(
+                name=name,
+                parent=self.styles[parent_name],
+                fontName=safe_font,
+                **overrides
+            ))
+        
+        # 分割线样式（不含文字，沿用默认字体）
         self.styles.add(ParagraphStyle(
             name='Separator',
             parent=self.styles['Normal'],
@@ -400,7 +449,7 @@ class ExamPDFGenerator:
             Path to the generated PDF file
         """
         # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        ensure_output_dir(output_path)
         
         # Create PDF document with two-column layout
         doc = TwoColumnDocTemplate(output_path, pagesize=A4)
@@ -411,9 +460,16 @@ class ExamPDFGenerator:
         # Add title only - 简化头部，只保留标题
         story.append(Paragraph(exam_title, self.styles['ExamTitle']))
         
+        # 一次遍历完成总分统计和数学符号预处理（选项、答案和解析只替换一次，正文和答案页共用）
+        total_points = 0
+        normalized_questions = []
+        for question in questions:
+            total_points += question.get('points', 1)
+            normalized_questions.append(self._normalize_question(question))
+        questions = normalized_questions
+        
         # Add minimal exam info in one line
         date_str = datetime.now().strftime("%Y年%m月%d日")
-        total_points = sum(q.get('points', 1) for q in questions)
         info_text = f"日期：{date_str} | 题数：{len(questions)}题 | 总分：{total_points}分 | 时间：90分钟"
         story.append(Paragraph(info_text, self.styles['ExamInfo']))
         story.append(Spacer(1, 0.2*cm))
@@ -421,8 +477,7 @@ class ExamPDFGenerator:
         # Add questions with better spacing for two-column layout
         for i, question in enumerate(questions, 1):
             # 将每个题目包装在KeepTogether中，避免跨栏分割
-            question_content = []
-            self._add_question_to_story(question_content, i, question, include_answers)
+            question_content = self._add_question_to_story(i, question, include_answers)
             
             # 将题目内容作为一个整体添加
             if question_content:
@@ -443,22 +498,42 @@ class ExamPDFGenerator:
         doc.build(story)
         return output_path
     
-    def _add_question_to_story(self, story: List, question_num: int, question: Dict[str, Any], include_answers: bool = False):
-        """Add a single question to the PDF story."""
+    @staticmethod
+    def _normalize_question(question: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of the question with math symbols replaced in options and answers.
+        
+        The question text is left as is so LaTeX detection still sees the original symbols.
+        """
+        normalized = {
+            **question,
+            **{
+                key: replace_math_symbols(question[key])
+                for key in _NORMALIZED_FIELDS
+                if isinstance(question.get(key), str)
+            },
+        }
+        # 只处理列表形式的选项，缺失或为None时保持原样
+        if isinstance(question.get('options'), list):
+            normalized['options'] = [replace_math_symbols(option) for option in question['options']]
+        return normalized
+    
+    def _add_question_to_story(self, question_num: int, question: Dict[str, Any], include_answers: bool = False) -> List:
+        """Build the flowables for a single question."""
+        parts = []
         points = question.get('points', 1)
         # 处理数学内容
         question_text = f"<b>{question_num}. </b>{question['question_text']} <b>({points}分)</b>"
         
         # 如果包含数学符号，使用特殊处理
-        if LATEX_AVAILABLE and latex_processor.detect_math_expressions(question['question_text']):
+        if _has_math(question['question_text']) and _latex_available():
             # 分别处理题号和题目内容
-            story.append(Paragraph(f"<b>{question_num}. </b>", self.styles['Question']))
-            process_math_content(question['question_text'], story, self.styles['Question'])
-            story.append(Paragraph(f"<b>({points}分)</b>", self.styles['Question']))
+            parts.append(Paragraph(f"<b>{question_num}. </b>", self.styles['Question']))
+            process_math_content(question['question_text'], parts, self.styles['Question'])
+            parts.append(Paragraph(f"<b>({points}分)</b>", self.styles['Question']))
         else:
             safe_question_text = replace_math_symbols(question['question_text'])
             question_text = f"<b>{question_num}. </b>{safe_question_text} <b>({points}分)</b>"
-            story.append(Paragraph(question_text, self.styles['Question']))
+            parts.append(Paragraph(question_text, self.styles['Question']))
         
         question_type = question.get('question_type', 'short_answer')
         
@@ -466,113 +541,105 @@ class ExamPDFGenerator:
             options = question.get('options', [])
             for i, option in enumerate(options):
                 letter = chr(65 + i)  # A, B, C, D
-                # 替换选项中的数学符号
-                safe_option = replace_math_symbols(option)
-                
-                # 更强力的重复标号清理
-                import re
-                # 清理各种可能的重复标号格式
-                patterns_to_remove = [
-                    r'^[A-D][\.\)]\s*',      # A. 或 A) 
-                    r'^[A-D][\.\)]\s*[A-D][\.\)]\s*',  # A. A. 或 A) A)
-                    r'^\([A-D]\)\s*',        # (A) 
-                    r'^[A-D]\s*[\.\)]\s*',   # A . 或 A )
-                ]
-                
-                for pattern in patterns_to_remove:
-                    safe_option = re.sub(pattern, '', safe_option)
-                
-                # 清理开头的多余空格
-                safe_option = safe_option.strip()
+                # 清理各种可能的重复标号格式，并清理开头的多余空格（数学符号已在预处理中替换）
+                safe_option = _OPTION_LABEL_RE.sub('', option, count=1).strip()
                 
                 option_text = f"{letter}. {safe_option}"
                 if include_answers and question.get('correct_answer') == option:
                     option_text = f"<b>{option_text} ✓</b>"
-                story.append(Paragraph(option_text, self.styles['Option']))
+                parts.append(Paragraph(option_text, self.styles['Option']))
         
         elif question_type == 'true_false':
             tf_text = "☐ 正确 &nbsp;&nbsp;&nbsp;&nbsp; ☐ 错误"
             if include_answers:
-                correct = replace_math_symbols(question.get('correct_answer', '')).lower()
+                correct = question.get('correct_answer', '').lower()
                 if 'true' in correct or '正确' in correct:
                     tf_text = "☑ 正确 &nbsp;&nbsp;&nbsp;&nbsp; ☐ 错误"
                 else:
                     tf_text = "☐ 正确 &nbsp;&nbsp;&nbsp;&nbsp; ☑ 错误"
-            story.append(Paragraph(tf_text, self.styles['Option']))
+            parts.append(Paragraph(tf_text, self.styles['Option']))
         
         elif question_type == 'fill_blank':
             if not include_answers:
-                story.append(Paragraph("答案：_____________", self.styles['Option']))
+                parts.append(Paragraph("答案：_____________", self.styles['Option']))
             else:
-                answer = replace_math_symbols(question.get('correct_answer', '参考答案略'))
-                story.append(Paragraph(f"答案：{answer}", self.styles['Option']))
+                answer = question.get('correct_answer', '参考答案略')
+                parts.append(Paragraph(f"答案：{answer}", self.styles['Option']))
         
         elif question_type == 'calculation':
             if not include_answers:
-                story.append(Paragraph("解：", self.styles['Option']))
+                parts.append(Paragraph("解：", self.styles['Option']))
                 # 极度压缩答题行数
                 for _ in range(2):  # 从3行减少到2行
-                    story.append(Paragraph("_" * 40, self.styles['AnswerSpace']))  # 进一步缩短线长
+                    parts.append(copy.copy(self._answer_line))  # 进一步缩短线长
             else:
-                answer = replace_math_symbols(question.get('correct_answer', '参考解答略'))
-                story.append(Paragraph(f"解：{answer}", self.styles['Option']))
+                answer = question.get('correct_answer', '参考解答略')
+                parts.append(Paragraph(f"解：{answer}", self.styles['Option']))
         
         elif question_type == 'application':
             if not include_answers:
-                story.append(Paragraph("解：", self.styles['Option']))
+                parts.append(Paragraph("解：", self.styles['Option']))
                 # 极度压缩答题行数
                 for _ in range(2):  # 从3行减少到2行
-                    story.append(Paragraph("_" * 40, self.styles['AnswerSpace']))
+                    parts.append(copy.copy(self._answer_line))
             else:
-                answer = replace_math_symbols(question.get('correct_answer', '参考答案略'))
-                story.append(Paragraph(f"答案：{answer}", self.styles['Option']))
+                answer = question.get('correct_answer', '参考答案略')
+                parts.append(Paragraph(f"答案：{answer}", self.styles['Option']))
         
         elif question_type == 'analysis':
             if not include_answers:
-                story.append(Paragraph("分析：", self.styles['Option']))
+                parts.append(Paragraph("分析：", self.styles['Option']))
                 # 极度压缩答题行数
                 for _ in range(2):  # 从3行减少到2行
-                    story.append(Paragraph("_" * 40, self.styles['AnswerSpace']))
+                    parts.append(copy.copy(self._answer_line))
             else:
-                answer = replace_math_symbols(question.get('correct_answer', '参考分析略'))
-                story.append(Paragraph(f"分析：{answer}", self.styles['Option']))
+                answer = question.get('correct_answer', '参考分析略')
+                parts.append(Paragraph(f"分析：{answer}", self.styles['Option']))
         
         elif question_type == 'short_answer':
             if not include_answers:
-                story.append(Paragraph("答：", self.styles['Option']))
+                parts.append(Paragraph("答：", self.styles['Option']))
                 # 极度压缩答题行数
-                story.append(Paragraph("_" * 40, self.styles['AnswerSpace']))  # 只保留1行
+                parts.append(copy.copy(self._answer_line))  # 只保留1行
             else:
-                answer = replace_math_symbols(question.get('correct_answer', '参考答案略'))
-                story.append(Paragraph(f"答：{answer}", self.styles['Option']))
+                answer = question.get('correct_answer', '参考答案略')
+                parts.append(Paragraph(f"答：{answer}", self.styles['Option']))
         
         elif question_type == 'essay':
             if not include_answers:
-                story.append(Paragraph("答：", self.styles['Option']))
+                parts.append(Paragraph("答：", self.styles['Option']))
                 # 论述题也大幅压缩
                 for _ in range(3):  # 从4行减少到3行
-                    story.append(Paragraph("_" * 40, self.styles['AnswerSpace']))
+                    parts.append(copy.copy(self._answer_line))
             else:
-                answer = replace_math_symbols(question.get('correct_answer', '参考答案略，请根据评分标准评判'))
-                story.append(Paragraph(f"答案要点：{answer}", self.styles['Option']))
+                answer = question.get('correct_answer', '参考答案略，请根据评分标准评判')
+                parts.append(Paragraph(f"答案要点：{answer}", self.styles['Option']))
         
-        story.append(Spacer(1, 0.08*cm))  # 极度减少题目间距
+        parts.append(Spacer(1, 0.08*cm))  # 极度减少题目间距
+        return parts
     
     def _add_answer_to_story(self, story: List, question_num: int, question: Dict[str, Any]):
         """Add answer to the answer key section."""
         answer_text = f"<b>{question_num}. </b>"
         
         if question.get('correct_answer'):
-            # 替换答案中的数学符号
-            safe_answer = replace_math_symbols(question['correct_answer'])
-            answer_text += safe_answer
+            answer_text += question['correct_answer']
         else:
             answer_text += "请参考评分标准"
         
         if question.get('explanation'):
-            # 替换解析中的数学符号
-            safe_explanation = replace_math_symbols(question['explanation'])
-            answer_text += f"<br/><i>解析：{safe_explanation}</i>"
+            answer_text += f"<br/><i>解析：{question['explanation']}</i>"
         
         story.append(Paragraph(answer_text, self.styles['ExamInfo']))
-        story.append(Spacer(1, 0.05*cm))  # 极度减少答案间距
\ No newline at end of file
+        story.append(Spacer(1, 0.05*cm))  # 极度减少答案间距
+
+
+@lru_cache(maxsize=None)
+def _get_process_generator() -> ExamPDFGenerator:
+    """Return this process's generator; fonts and styles are set up once per worker."""
+    return ExamPDFGenerator()
+
+
+def render_exam_pdf(**kwargs) -> str:
+    """Render an exam PDF with this process's shared generator (process-pool worker)."""
+    return _get_process_generator().generate_exam_pdf(**kwargs)
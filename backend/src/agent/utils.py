@@ -1,22 +1,33 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from langchain_core.messages import AnyMessage, AIMessage, HumanMessage
 
 
+_ROLE_LABELS = {HumanMessage: "User", AIMessage: "Assistant"}
+
+
+def _role_label(message: AnyMessage) -> Optional[str]:
+    """Return the transcript label for a message, or None to skip it."""
+    label = _ROLE_LABELS.get(type(message))
+    if label is None:
+        # Fall back to isinstance for subclasses such as message chunks
+        for message_type, candidate in _ROLE_LABELS.items():
+            if isinstance(message, message_type):
+                return candidate
+    return label
+
+
 def get_research_topic(messages: List[AnyMessage]) -> str:
     """
     Get the research topic from the messages.
     """
     # check if request has a history and combine the messages into a single string
     if len(messages) == 1:
-        research_topic = messages[-1].content
-    else:
-        research_topic = ""
-        for message in messages:
-            if isinstance(message, HumanMessage):
-                research_topic += f"User: {message.content}\n"
-            elif isinstance(message, AIMessage):
-                research_topic += f"Assistant: {message.content}\n"
-    return research_topic
+        return messages[-1].content
+    return "".join(
+        f"{label}: {message.content}\n"
+        for message in messages
+        if (label := _role_label(message)) is not None
+    )
 
 
 def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
@@ -59,27 +70,27 @@ def insert_citation_markers(text, citations_list):
     """
     # Sort citations by end_index in descending order.
     # If end_index is the same, secondary sort by start_index descending.
-    # This ensures that insertions at the end of the string don't affect
-    # the indices of earlier parts of the string that still need to be processed.
+    # Markers sharing an end_index appear in the text in the reverse of this
+    # order, so walking the sorted list backwards visits them left to right.
     sorted_citations = sorted(
         citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
     )
 
-    modified_text = text
-    for citation_info in sorted_citations:
-        # These indices refer to positions in the *original* text,
-        # but since we iterate from the end, they remain valid for insertion
-        # relative to the parts of the string already processed.
+    # Build the result in a single pass over the original text instead of
+    # re-slicing the whole string for every citation.
+    parts = []
+    prev_idx = 0
+    for citation_info in reversed(sorted_citations):
         end_idx = citation_info["end_index"]
-        marker_to_insert = ""
-        for segment in citation_info["segments"]:
-            marker_to_insert += f" [{segment['label']}]({segment['short_url']})"
-        # Insert the citation marker at the original end_idx position
-        modified_text = (
-            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
-        )
+        parts.append(text[prev_idx:end_idx])
+        parts.append("".join(
+            f" [{segment['label']}]({segment['short_url']})"
+            for segment in citation_info["segments"]
+        ))
+        prev_idx = end_idx
+    parts.append(text[prev_idx:])
 
-    return modified_text
+    return "".join(parts)
 
 
 def get_citations(response, resolved_urls_map):
@@ -96,23 +107,24 @@ def get_citations(response, resolved_urls_map):
     Returns:
         list: A list of dictionaries representing citations with basic structure
     """
-    citations = []
-    
     # For OpenAI compatible APIs, we create simplified citations
     # In a real implementation, you would integrate with a search API
     # that provides proper source attribution
+    content_len = len(response.content) if hasattr(response, 'content') else 0
     
-    if resolved_urls_map:
-        for idx, (original_url, short_url) in enumerate(resolved_urls_map.items()):
-            citation = {
-                "start_index": 0,
-                "end_index": len(response.content) if hasattr(response, 'content') else 0,
-                "segments": [{
-                    "label": f"Source {idx + 1}",
-                    "short_url": short_url,
-                    "value": original_url,
-                }]
-            }
-            citations.append(citation)
+    # Zero-length citations would only be sorted and spliced in for nothing
+    if not content_len or not resolved_urls_map:
+        return []
     
-    return citations
+    return [
+        {
+            "start_index": 0,
+            "end_index": content_len,
+            "segments": [{
+                "label": f"Source {idx + 1}",
+                "short_url": short_url,
+                "value": original_url,
+            }]
+        }
+        for idx, (original_url, short_url) in enumerate(resolved_urls_map.items())
+    ]